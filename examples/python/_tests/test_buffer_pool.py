@@ -0,0 +1,87 @@
+import struct
+import tracemalloc
+import unittest
+import sys
+
+sys.path.append("..")
+from buffer_pool import BufferPool
+from cobs import max_framed_length, pack
+from messages import DeviceNotification, InfoResponse
+from router import IMU, MessageRouter
+
+INFO = InfoResponse(1, 0, 10, 1, 2, 300, 20, 2048, 476, 0)
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = BufferPool(sizes=(64, 256))
+
+    def test_size_classes(self):
+        self.assertEqual(len(self.pool.acquire(1)), 64)
+        self.assertEqual(len(self.pool.acquire(64)), 64)
+        self.assertEqual(len(self.pool.acquire(65)), 256)
+        # larger than any class
+        self.assertEqual(len(self.pool.acquire(1000)), 1000)
+        self.pool.add_limits(INFO)
+        self.assertEqual(self.pool.sizes, [20, 64, 256, max_framed_length(2048)])
+
+    def test_reuse_and_stats(self):
+        buffers = [self.pool.acquire(10) for _ in range(3)]
+        for buffer in buffers:
+            self.pool.release(buffer)
+        for _ in range(10):
+            buffer = self.pool.acquire(10)
+            self.assertIn(buffer, buffers)
+            self.pool.release(buffer)
+        self.assertEqual((self.pool.hits, self.pool.misses), (10, 3))
+        self.assertEqual(self.pool.in_use, 0)
+        self.assertEqual(self.pool.peak_in_use, 3)
+        self.assertIn("hit rate 76.9%", self.pool.report())
+
+    def test_bounded_free_list(self):
+        pool = BufferPool(sizes=(64,), max_free=2)
+        buffers = [pool.acquire(64) for _ in range(5)]
+        for buffer in buffers:
+            pool.release(buffer)
+        self.assertEqual(len(pool._free[64]), 2)
+
+    def test_discard(self):
+        buffer = self.pool.acquire(10)
+        self.pool.discard(buffer)
+        self.assertEqual(self.pool.in_use, 0)
+        self.assertIsNot(self.pool.acquire(10), buffer)
+
+    def test_router_steady_state(self):
+        self.pool.add_size_class(4096)
+        router = MessageRouter(self.pool)
+        received = 0
+
+        def on_imu(values):
+            nonlocal received
+            received += 1
+
+        router.subscribe_device(IMU, on_imu)
+        record = struct.pack("<BBBhhhhhhhhh", IMU, 0, 0, *range(9))
+        payload = record * 100
+        frame = pack(struct.pack("<BH", DeviceNotification.ID, len(payload)) + payload)
+        router.on_frame(frame)
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for _ in range(100):
+                router.on_frame(frame)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # the frame is decoded without copying it, and nothing is kept per frame
+        self.assertLess(peak - before, len(frame) // 2)
+        self.assertLess(after - before, 100)
+        self.assertEqual(received, 10100)
+        self.assertEqual(self.pool.misses, 1)
+        self.assertEqual(self.pool.in_use, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
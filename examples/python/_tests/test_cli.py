@@ -0,0 +1,47 @@
+import argparse
+import contextlib
+import io
+import unittest
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append("..")
+from cli import _run
+
+
+class TestRun(unittest.TestCase):
+
+    def run_command(self, error):
+        async def command(args):
+            raise error
+
+        output = io.StringIO()
+        with contextlib.redirect_stderr(output):
+            status = _run(command, argparse.Namespace())
+        return status, output.getvalue()
+
+    def test_reports_errors(self):
+        for error in (
+            ConnectionError("No hubs detected."),
+            OSError(98, "address already in use"),
+            ValueError("Message too large"),
+        ):
+            with self.subTest(error=error):
+                status, output = self.run_command(error)
+                self.assertEqual(status, 1)
+                self.assertEqual(output, f"Error: {error}\n")
+
+    def test_reports_ble_errors(self):
+        class BleakError(Exception):
+            pass
+
+        bleak_exc = SimpleNamespace(BleakError=BleakError)
+        with mock.patch.dict(sys.modules, {"bleak.exc": bleak_exc}):
+            status, output = self.run_command(BleakError("Device not found"))
+        self.assertEqual(status, 1)
+        self.assertEqual(output, "Error: Device not found\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
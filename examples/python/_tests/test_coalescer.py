@@ -0,0 +1,71 @@
+import asyncio
+import contextlib
+import io
+import unittest
+import sys
+
+sys.path.append("..")
+from coalescer import WriteCoalescer, write_frame
+
+
+class TestWriteCoalescer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.packets = []
+
+        async def write_packet(packet):
+            self.packets.append(packet)
+
+        self.coalescer = WriteCoalescer(write_packet, packet_size=8, delay=0.01)
+
+    async def test_unknown_packet_size(self):
+        self.coalescer.packet_size = None
+        await self.coalescer.write(b"0123456789\x02")
+        self.assertEqual(self.packets, [b"0123456789\x02"])
+
+    async def test_coalesce_until_deadline(self):
+        await self.coalescer.write(b"ab\x02")
+        await self.coalescer.write(b"cd\x02")
+        self.assertEqual(self.packets, [])
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.packets, [b"ab\x02cd\x02"])
+
+    async def test_full_packets_written_immediately(self):
+        await self.coalescer.write(b"abcdef\x02")
+        await self.coalescer.write(b"ghijkl\x02")
+        self.assertEqual(self.packets, [b"abcdef\x02g"])
+        await self.coalescer.write(b"m\x02", flush=True)
+        self.assertEqual(self.packets, [b"abcdef\x02g", b"hijkl\x02m\x02"])
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(self.packets), 2)
+        self.assertEqual(self.coalescer.frames_written, 3)
+
+    async def test_deadline_flush_errors_are_reported(self):
+        async def write_packet(packet):
+            raise OSError("write failed")
+
+        coalescer = WriteCoalescer(write_packet, packet_size=8, delay=0.01)
+        await coalescer.write(b"ab\x02")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            await asyncio.sleep(0.05)
+        self.assertEqual(output.getvalue(), "Error: write failed\n")
+        await coalescer.close()
+
+    async def test_close_waits_for_deadline_flush(self):
+        await self.coalescer.write(b"ab\x02")
+        await asyncio.sleep(0.02)
+        await self.coalescer.write(b"cd\x02")
+        await self.coalescer.close()
+        self.assertEqual(self.packets, [b"ab\x02", b"cd\x02"])
+        self.assertIsNone(self.coalescer._timer)
+
+    async def test_write_frame(self):
+        await write_frame(self.coalescer.write_packet, b"0123456789\x02", 4)
+        self.assertEqual(self.packets, [b"0123", b"4567", b"89\x02"])
+        await write_frame(self.coalescer.write_packet, b"ab\x02")
+        self.assertEqual(self.packets[-1], b"ab\x02")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ import sys
 
 sys.path.append("..")
 from cobs import encode, decode, pack, unpack
+from cobs import encoded_length, framed_length, peek, plan_packets
+from cobs import pack_into, unpack_into
 
 # fmt: off
 TEST_CASES = (
@@ -49,6 +51,53 @@ class TestCobs(unittest.TestCase):
             with self.subTest(data=data, expected=expected):
                 self.assertEqual(unpack(data), expected)
 
+    def test_encoded_length(self):
+        cases = [data for data, _ in TEST_CASES]
+        # runs of bytes around the maximum block size, with and without escapes
+        for size in (0, 1, 83, 84, 85, 167, 168, 169, 300):
+            cases.append(b"a" * size)
+            cases.append(b"a" * size + b"\x01" + b"b" * size + b"\x00")
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertEqual(encoded_length(data), len(encode(data)))
+                self.assertEqual(framed_length(data), len(pack(data)))
+
+    def test_pack_unpack_into(self):
+        cases = [data for data, _ in TEST_CASES]
+        for size in (0, 1, 83, 84, 85, 168, 300):
+            cases.append(b"a" * size)
+            cases.append(b"\x02" + b"a" * size + b"\x01" + b"b" * size + b"\x00")
+        for data in cases:
+            with self.subTest(data=data):
+                buffer = bytearray(framed_length(data))
+                size = pack_into(data, buffer)
+                self.assertEqual(bytes(buffer[:size]), pack(data))
+                decoded = bytearray(size)
+                length = unpack_into(buffer[:size], decoded)
+                self.assertEqual(bytes(decoded[:length]), data)
+                decoded = bytearray(size + 1)
+                length = unpack_into(b"\x01" + buffer[:size], decoded)
+                self.assertEqual(bytes(decoded[:length]), data)
+
+    def test_peek(self):
+        cases = [data for data, _ in TEST_CASES]
+        cases += [bytes((i,)) + b"x" * 100 for i in range(256)]
+        cases += [b"\x02", b"\x01" + b"x" * 83 + b"\x00"]
+        for data in cases:
+            with self.subTest(data=data):
+                self.assertEqual(peek(pack(data)), data[0])
+                self.assertEqual(peek(b"\x01" + pack(data)), data[0])
+
+    def test_plan_packets(self):
+        payloads = [b"Hello, World!", b"\x00" * 100, b"x" * 200]
+        stream = b"".join(map(pack, payloads))
+        plan = plan_packets(payloads, 64)
+        self.assertEqual(plan[-1][1], len(stream))
+        self.assertEqual(b"".join(stream[start:end] for start, end in plan), stream)
+        self.assertTrue(all(end - start <= 64 for start, end in plan))
+        with self.assertRaises(ValueError):
+            plan_packets(payloads, 64, max_message_size=150)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import io
+import struct
+import unittest
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append("..")
+from cobs import pack, unpack
+from buffer_pool import BufferPool
+from connection import DIRECT_CONNECT_TIMEOUT, HubConnection, connect, connect_ble
+from messages import InfoRequest, InfoResponse
+
+INFO = InfoResponse(1, 0, 10, 1, 2, 300, 20, 2048, 476, 0)
+
+
+def info_frame(info):
+    return pack(struct.pack("<BBBHBBHHHHH", InfoResponse.ID, *vars(info).values()))
+
+
+class TestHubConnection(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.packets = []
+
+        async def write_packet(packet):
+            self.packets.append(packet)
+
+        self.received = []
+        self.pool = BufferPool()
+        self.connection = HubConnection(
+            write_packet, self.received.append, pool=self.pool
+        )
+        self.connection.start()
+
+    async def asyncTearDown(self):
+        await self.connection.close()
+
+    async def wait_for_packet(self):
+        while not self.packets:
+            await asyncio.sleep(0.001)
+
+    def test_reassembles_split_and_combined_frames(self):
+        frames = [pack(b"\x21hello\0"), pack(b"\x21world\0")]
+        data = b"".join(frames)
+        # a frame split across packets, and a packet holding parts of two frames
+        for packet in (data[:3], data[3:12], data[12:]):
+            self.connection.on_packet(packet)
+        self.assertEqual([m.text for m in self.received], ["hello", "world"])
+        self.assertEqual(list(self.connection.console.lines), [])
+
+    def test_malformed_frames_are_skipped(self):
+        truncated = pack(bytes([InfoResponse.ID, 1, 0]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.connection.on_packet(b"\x02" + truncated)
+        self.connection.on_packet(pack(b"\x21hello\0"))
+        self.assertEqual([m.text for m in self.received], ["hello"])
+        self.assertEqual(len(self.connection._buffer), 0)
+
+    def test_frame_is_consumed_if_handler_fails(self):
+        def fail(message):
+            raise RuntimeError("handler failed")
+
+        unsubscribe = self.connection.router.subscribe_all(fail)
+        with self.assertRaises(RuntimeError):
+            self.connection.on_packet(pack(b"\x21hello\0") + pack(b"\x21world\0"))
+        unsubscribe()
+        self.connection.on_packet(pack(b"\x21again\0"))
+        self.assertEqual([m.text for m in self.received], ["hello", "world", "again"])
+        self.assertEqual(len(self.connection._buffer), 0)
+
+    async def test_handshake_applies_limits(self):
+        task = asyncio.create_task(self.connection.handshake())
+        await self.wait_for_packet()
+        self.assertEqual(unpack(self.packets[0]), InfoRequest().serialize())
+
+        self.connection.on_packet(info_frame(INFO))
+        info = await task
+        self.assertEqual(vars(info), vars(INFO))
+        self.assertEqual(self.connection.coalescer.packet_size, INFO.max_packet_size)
+        self.assertIsNotNone(self.connection.tunnel)
+
+    async def test_cached_limits_are_used_immediately(self):
+        info = await self.connection.handshake(INFO)
+        self.assertIs(info, INFO)
+        self.assertEqual(self.connection.coalescer.packet_size, INFO.max_packet_size)
+        await self.wait_for_packet()
+        self.connection.on_packet(info_frame(INFO))
+        confirmed = await self.connection.info_request
+        self.assertEqual(vars(confirmed), vars(INFO))
+
+    async def test_send_buffers_are_reused(self):
+        for _ in range(5):
+            await self.connection.send_message(InfoRequest())
+        self.assertEqual(self.packets, [pack(InfoRequest().serialize())] * 5)
+        self.assertEqual((self.pool.hits, self.pool.misses), (4, 1))
+        self.assertEqual(self.pool.in_use, 0)
+
+    async def test_send_buffers_are_released_on_failure(self):
+        async def write_packet(packet):
+            raise OSError("write failed")
+
+        connection = HubConnection(write_packet, pool=self.pool)
+        connection.start()
+        # assertRaises would clear the frames in the traceback, which include
+        # the suspended frame of the scheduler task
+        (error,) = await asyncio.gather(
+            connection.send_message(InfoRequest()), return_exceptions=True
+        )
+        self.assertIsInstance(error, OSError)
+        send = asyncio.create_task(connection.send_message(InfoRequest()))
+        await asyncio.sleep(0)
+        send.cancel()
+        await asyncio.gather(send, return_exceptions=True)
+        self.assertTrue(send.cancelled())
+        await connection.close()
+        self.assertEqual(self.pool.in_use, 0)
+
+    async def test_requests_are_forgotten_after_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                self.connection.send_request(InfoRequest(), InfoResponse), 0.01
+            )
+        self.assertEqual(self.connection.pending_requests(), 0)
+
+    async def test_responses_answer_requests_in_order(self):
+        send_request = self.connection.send_request
+        requests = [
+            asyncio.create_task(send_request(InfoRequest(), InfoResponse))
+            for _ in range(2)
+        ]
+        while len(self.packets) < 2:
+            await asyncio.sleep(0.001)
+        self.assertEqual(self.connection.pending_requests(), 2)
+        self.connection.on_packet(info_frame(INFO) * 2)
+        responses = await asyncio.gather(*requests)
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(self.connection.pending_requests(), 0)
+
+
+class TestConnectBle(unittest.IsolatedAsyncioTestCase):
+
+    async def connect(self, client):
+        bleak = SimpleNamespace(BleakClient=mock.Mock(return_value=client))
+        with mock.patch.dict(sys.modules, {"bleak": bleak}):
+            return await connect_ble("00:11:22:33:44:55")
+
+    async def test_disconnects_if_service_is_missing(self):
+        client = mock.AsyncMock()
+        client.services.get_service = mock.Mock(return_value=None)
+        with self.assertRaises(ConnectionError):
+            await self.connect(client)
+        client.disconnect.assert_awaited_once()
+
+    async def test_disconnects_if_notifications_fail(self):
+        client = mock.AsyncMock()
+        client.services.get_service = mock.Mock()
+        client.start_notify.side_effect = OSError("failed")
+        with self.assertRaises(OSError):
+            await self.connect(client)
+        client.disconnect.assert_awaited_once()
+
+
+class TestConnect(unittest.IsolatedAsyncioTestCase):
+
+    async def test_last_known_hub_uses_direct_timeout(self):
+        cache = mock.Mock()
+        cache.addresses.return_value = ["00:11:22:33:44:55"]
+        bleak_exc = SimpleNamespace(BleakError=Exception)
+        with mock.patch.dict(sys.modules, {"bleak.exc": bleak_exc}), mock.patch(
+            "connection.connect_ble"
+        ) as connect_ble_mock, contextlib.redirect_stdout(io.StringIO()):
+            await connect(cache, timeout=20.0, verbose=True)
+        connect_ble_mock.assert_awaited_once_with(
+            "00:11:22:33:44:55", timeout=DIRECT_CONNECT_TIMEOUT, verbose=True
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
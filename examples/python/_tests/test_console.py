@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+import sys
+
+sys.path.append("..")
+from console import ConsoleStream
+from messages import ConsoleNotification
+
+
+class TestConsoleStream(unittest.IsolatedAsyncioTestCase):
+
+    def test_split_character_and_lines(self):
+        console = ConsoleStream()
+        data = "héllo wörld\r\nsecond\nthi".encode("utf8")
+        for i in range(len(data)):
+            console.feed(data[i : i + 1])
+        self.assertEqual(console.drain(), ["héllo wörld", "second"])
+        console.feed(b"rd\n")
+        self.assertEqual(console.drain(), ["third"])
+
+    def test_flush(self):
+        console = ConsoleStream()
+        console.feed(b"no newline")
+        self.assertEqual(console.drain(), [])
+        console.flush()
+        self.assertEqual(console.drain(), ["no newline"])
+
+    def test_bounded(self):
+        console = ConsoleStream(max_lines=3)
+        console.feed(b"1\n2\n3\n4\n5\n")
+        self.assertEqual(console.dropped, 2)
+        self.assertEqual(console.drain(max_lines=2), ["3", "4"])
+        self.assertEqual(console.drain(), ["5"])
+
+    def test_long_line(self):
+        console = ConsoleStream(max_line_length=10)
+        for _ in range(5):
+            console.feed(b"abcdefg")
+        self.assertEqual(console.drain(), ["abcdefgabc", "defgabcdef", "gabcdefgab"])
+        self.assertEqual(console.broken_lines, 3)
+        console.feed(b"\n")
+        self.assertEqual(console.drain(), ["cdefg"])
+
+    async def test_async_iterator(self):
+        console = ConsoleStream()
+        loop = asyncio.get_running_loop()
+        loop.call_soon(console.feed, b"a\nb")
+        loop.call_later(0.01, console.feed, b"\n")
+        lines = []
+        async for line in console:
+            lines.append(line)
+            if len(lines) == 2:
+                break
+        self.assertEqual(lines, ["a", "b"])
+
+    def test_notification_split_character(self):
+        # decoding a single notification no longer raises
+        message = ConsoleNotification.deserialize(b"\x21h\xc3\0\0")
+        self.assertEqual(message.payload, b"h\xc3")
+        self.assertEqual(message.text, "h�")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import unittest
+import sys
+from multiprocessing.shared_memory import SharedMemory
+
+sys.path.append("..")
+from cobs import pack
+from decode_pool import MAX_HUBS, DecodePool, SharedRing, ERROR_ID, decode_frame
+from messages import ConsoleNotification
+
+
+class TestSharedRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = SharedRing(capacity=32)
+
+    def tearDown(self):
+        self.ring.close(unlink=True)
+
+    def test_put_get(self):
+        self.assertIsNone(self.ring.get())
+        self.assertTrue(self.ring.put(3, b"abc"))
+        self.assertEqual(self.ring.get(), (3, b"abc"))
+        self.assertIsNone(self.ring.get())
+
+    def test_full(self):
+        self.assertTrue(self.ring.put(0, bytes(28)))
+        self.assertFalse(self.ring.put(0, b"x"))
+
+    def test_wrap_around(self):
+        for i in range(20):
+            frame = bytes(range(i, i + 10))
+            self.assertTrue(self.ring.put(i, frame))
+            self.assertEqual(self.ring.get(), (i, frame))
+
+
+class TestDecodePool(unittest.TestCase):
+
+    def test_decode_frame(self):
+        frame = pack(b"\x21hello\0")
+        self.assertEqual(
+            decode_frame(frame), (ConsoleNotification.ID, {"payload": b"hello"})
+        )
+        self.assertEqual(decode_frame(pack(b"\xfe"))[0], ERROR_ID)
+
+    def test_order_per_hub(self):
+        hubs = ("a", "b", "c")
+        count = 200
+        with DecodePool(workers=2) as pool:
+            for i in range(count):
+                for hub in hubs:
+                    text = f"{hub}{i}".encode("utf8")
+                    self.assertTrue(pool.submit(hub, pack(b"\x21" + text + b"\0")))
+
+            received = {hub: [] for hub in hubs}
+            while sum(map(len, received.values())) < count * len(hubs):
+                for hub, id, fields in pool.get(timeout=5):
+                    self.assertEqual(id, ConsoleNotification.ID)
+                    received[hub].append(fields["payload"].decode("utf8"))
+
+        for hub in hubs:
+            self.assertEqual(received[hub], [f"{hub}{i}" for i in range(count)])
+
+    def test_close_with_dead_worker(self):
+        pool = DecodePool(workers=1, capacity=64)
+        pool.start()
+        ring_name = pool._rings[0].name
+        pool._processes[0].kill()
+        pool._processes[0].join()
+        while pool.submit("a", pack(b"\x21hello\0")):
+            pass
+        start = time.monotonic()
+        pool.close()
+        self.assertLess(time.monotonic() - start, 5)
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=ring_name)
+
+    def test_too_many_hubs(self):
+        pool = DecodePool(workers=1)
+        for hub in range(MAX_HUBS):
+            pool._hub_index[hub] = len(pool._hubs)
+            pool._hubs.append(hub)
+        with self.assertRaises(ValueError):
+            pool.submit("another", pack(b"\x21hello\0"))
+
+    def test_cancelled_consumer_does_not_block_shutdown(self):
+        async def main():
+            with DecodePool(workers=1) as pool:
+
+                async def consume():
+                    async for _ in pool.results():
+                        pass
+
+                consumer = asyncio.create_task(consume())
+                await asyncio.sleep(0.05)
+                consumer.cancel()
+            # asyncio.run waits for the default executor to shut down
+
+        asyncio.run(asyncio.wait_for(main(), 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import unittest
+import sys
+
+sys.path.append("..")
+import firmware
+from crc import crc
+from firmware import FirmwareImage, upload_firmware
+from messages import (
+    BeginFirmwareUpdateRequest,
+    BeginFirmwareUpdateResponse,
+    StartFirmwareUploadRequest,
+    StartFirmwareUploadResponse,
+    TransferChunkRequest,
+    TransferChunkResponse,
+)
+from transfer import TransferError
+
+
+class FakeHub:
+    """Accepts a firmware upload, remembering how much was already uploaded."""
+
+    def __init__(self, uploaded=b""):
+        self.received = bytearray(uploaded)
+        self.running_crc = 0
+        self.chunks_received = 0
+        self.begin = None
+
+    async def send_request(self, message, response_type):
+        # round trip through serialization to check the encoding
+        message = message.serialize()
+        if message[0] == StartFirmwareUploadRequest.ID:
+            self.sha = message[1:21]
+            return StartFirmwareUploadResponse(True, len(self.received))
+        if message[0] == TransferChunkRequest.ID:
+            chunk = message[7:]
+            self.received += chunk
+            self.chunks_received += 1
+            self.running_crc = int.from_bytes(message[1:5], "little")
+            return TransferChunkResponse(True)
+        if message[0] == BeginFirmwareUpdateRequest.ID:
+            self.begin = message
+            return BeginFirmwareUpdateResponse(True)
+        raise AssertionError(message)
+
+
+class TestFirmware(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "firmware.bin")
+        self.data = os.urandom(3 * firmware.BLOCK_SIZE + 1234)
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+        self.image = FirmwareImage(self.path)
+
+    def tearDown(self):
+        self.image.close()
+        self.tmp.cleanup()
+
+    def chained_crc(self, offset, chunk_size):
+        running_crc = 0
+        for i in range(0, offset, chunk_size):
+            running_crc = crc(self.data[i : min(i + chunk_size, offset)], running_crc)
+        return running_crc
+
+    def test_hashes(self):
+        self.assertEqual(self.image.sha, hashlib.sha1(self.data).digest())
+        self.assertEqual(self.image.crc, crc(self.data))
+
+    def test_running_crc(self):
+        for chunk_size in (476, 477, 512):
+            for offset in (0, 476, 477 * 200, firmware.BLOCK_SIZE, len(self.data)):
+                with self.subTest(chunk_size=chunk_size, offset=offset):
+                    self.assertEqual(
+                        self.image.running_crc(offset, chunk_size),
+                        self.chained_crc(offset, chunk_size),
+                    )
+
+    def test_upload(self):
+        hub = FakeHub()
+        asyncio.run(upload_firmware(hub.send_request, self.image, 476))
+        self.assertEqual(hub.received, self.data)
+        self.assertEqual(hub.running_crc, self.chained_crc(len(self.data), 476))
+        self.assertEqual(hub.begin[1:21], self.image.sha)
+
+    def test_resume(self):
+        uploaded = 476 * 300
+        hub = FakeHub(self.data[:uploaded])
+        asyncio.run(upload_firmware(hub.send_request, self.image, 476))
+        self.assertEqual(hub.received, self.data)
+        self.assertEqual(hub.chunks_received, -(-(len(self.data) - uploaded) // 476))
+        self.assertEqual(hub.running_crc, self.chained_crc(len(self.data), 476))
+
+    def test_invalid_offset(self):
+        hub = FakeHub(self.data + b"extra")
+        with self.assertRaises(TransferError):
+            asyncio.run(upload_firmware(hub.send_request, self.image, 476))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import struct
+import unittest
+import sys
+
+sys.path.append("..")
+from cobs import pack
+from gateway import TelemetryGateway
+from messages import DeviceNotification
+from router import MessageRouter
+
+
+def notification(battery):
+    payload = struct.pack("<BB", 0x00, battery)
+    return pack(struct.pack("<BH", DeviceNotification.ID, len(payload)) + payload)
+
+
+class TestTelemetryGateway(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.gateway = TelemetryGateway()
+        self.router = MessageRouter()
+        self.gateway.attach("hub", self.router)
+
+    async def test_fan_out_and_conflation(self):
+        fast, slow = [], []
+        release = asyncio.Event()
+
+        async def send_fast(frame):
+            fast.append(frame)
+
+        async def send_slow(frame):
+            await release.wait()
+            slow.append(frame)
+
+        clients = [
+            self.gateway.add_client(send_fast),
+            self.gateway.add_client(send_slow),
+        ]
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+
+        for battery in range(10):
+            self.router.on_frame(notification(battery))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+
+        def levels(frames):
+            return [json.loads(frame)["devices"][0][1][1] for frame in frames]
+
+        self.assertEqual(levels(fast), list(range(10)))
+        # the slow client skips the updates that arrived while it was blocked
+        self.assertEqual(levels(slow), [0, 9])
+        self.assertEqual(clients[1].conflated, 8)
+        # every update is encoded once and the clients share the same frame
+        self.assertEqual(self.gateway.published, 10)
+        self.assertIs(fast[-1], slow[-1])
+
+    async def test_new_client_receives_latest_state(self):
+        self.router.on_frame(notification(50))
+        client = self.gateway.add_client(None)
+        self.assertEqual(client.pending(), 1)
+        self.gateway.remove_client(client)
+        self.router.on_frame(notification(40))
+        self.assertEqual(client.pending(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
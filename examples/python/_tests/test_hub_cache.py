@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import sys
+
+sys.path.append("..")
+from hub_cache import HubCache
+from messages import InfoResponse
+
+INFO = InfoResponse(1, 0, 10, 1, 2, 300, 509, 2048, 476, 0)
+
+
+class TestHubCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "hubs.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_missing_file(self):
+        cache = HubCache(self.path)
+        self.assertEqual(cache.addresses(), [])
+        self.assertIsNone(cache.info("AA:BB"))
+
+    def test_round_trip(self):
+        cache = HubCache(self.path)
+        cache.update("AA:BB", "Hub 1", bytes(range(16)))
+        cache.store_info("AA:BB", INFO)
+        cache.save()
+
+        cache = HubCache(self.path)
+        self.assertEqual(cache.addresses(), ["AA:BB"])
+        self.assertEqual(cache.get("AA:BB")["name"], "Hub 1")
+        self.assertEqual(cache.uuid("AA:BB"), bytes(range(16)))
+        self.assertEqual(vars(cache.info("AA:BB")), vars(INFO))
+        self.assertEqual(vars(cache.info("AA:BB", "1.2.300")), vars(INFO))
+        self.assertIsNone(cache.info("AA:BB", "9.9.9"))
+
+    def test_most_recent_first(self):
+        cache = HubCache(self.path)
+        cache.update("AA:BB")
+        cache.update("CC:DD")
+        cache.hubs["AA:BB"]["last_seen"] += 10
+        self.assertEqual(cache.addresses(), ["AA:BB", "CC:DD"])
+
+
+if __name__ == "__main__":
+    unittest.main()
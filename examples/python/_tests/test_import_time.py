@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+sys.path.append("..")
+
+EXAMPLES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# startup time of the CLI on top of the interpreter itself
+MAX_STARTUP = 0.1
+
+RUNS = 5
+
+
+def best_time(*args):
+    """Return the fastest of several runs of the interpreter with `args`."""
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args],
+            cwd=EXAMPLES,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def loaded_modules(module):
+    """Return the modules loaded by importing `module` in a new interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sys.modules)"],
+        cwd=EXAMPLES,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return set(output.split())
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_cli_starts_quickly(self):
+        baseline = best_time("-c", "pass")
+        startup = best_time("cli.py", "--help") - baseline
+        self.assertLess(startup, MAX_STARTUP)
+
+    def test_cli_does_not_import_backends(self):
+        modules = loaded_modules("cli")
+        for heavy in ("asyncio", "bleak", "connection", "messages"):
+            self.assertNotIn(heavy, modules)
+
+    def test_library_does_not_import_bleak(self):
+        for module in ("cobs", "crc", "messages", "connection", "scanner"):
+            self.assertNotIn("bleak", loaded_modules(module))
+
+    def test_protocol_does_not_import_asyncio(self):
+        for module in ("cobs", "crc", "messages"):
+            self.assertNotIn("asyncio", loaded_modules(module))
+
+
+if __name__ == "__main__":
+    unittest.main()
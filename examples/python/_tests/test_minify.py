@@ -0,0 +1,66 @@
+import ast
+import tempfile
+import unittest
+import sys
+
+sys.path.append("..")
+from minify import minify, minify_cached
+
+PROGRAM = b'''"""Module docstring."""
+import runloop
+
+# a comment
+class Robot:
+    """Class docstring."""
+
+    def drive(self, speed):
+        """Only a docstring."""
+
+
+    async def turn(self, angle):
+        if angle:
+            text = """multi
+    line"""
+            return [angle,
+                    text]
+'''
+
+EXPECTED = b'''import runloop
+class Robot:
+    def drive(self, speed):
+        pass
+    async def turn(self, angle):
+        if angle:
+            text = """multi
+    line"""
+            return [angle, text]
+'''
+
+
+class TestMinify(unittest.TestCase):
+
+    def test_equivalent(self):
+        minified = minify(PROGRAM)
+        self.assertLess(len(minified), len(PROGRAM))
+        self.assertNotIn(b"docstring", minified)
+        self.assertNotIn(b"comment", minified)
+        self.assertNotIn(b"\n\n", minified)
+        self.assertIn(b"\n  if angle:\n", minified)
+        self.assertEqual(ast.dump(ast.parse(minified)), ast.dump(ast.parse(EXPECTED)))
+
+    def test_never_larger(self):
+        self.assertEqual(minify(b"x=1"), b"x=1")
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = minify_cached(PROGRAM, cache_dir)
+            second = minify_cached(PROGRAM, cache_dir)
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.savings, len(PROGRAM) - len(second.data))
+        self.assertIn("(cached)", second.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import io
+import unittest
+import sys
+
+sys.path.append("..")
+from messages import DeviceNotificationResponse
+from notification_rate import IntervalController, NotificationRateManager, allocate
+
+
+class TestIntervalController(unittest.TestCase):
+
+    def test_speeds_up_to_minimum(self):
+        controller = IntervalController(min_interval_ms=50, initial_interval_ms=1000)
+        for _ in range(100):
+            controller.update()
+        self.assertEqual(controller.interval_ms, 50)
+
+    def test_backs_off_when_overloaded(self):
+        controller = IntervalController(max_interval_ms=800, initial_interval_ms=100)
+        controller.observe_queue_depth(100)
+        self.assertEqual(controller.update(), 200)
+        controller.observe_queue_depth(0)
+        controller.observe_rtt(5.0)  # smoothed to 1 second
+        self.assertEqual(controller.update(), 400)
+        self.assertEqual(controller.update(), 800)
+        self.assertEqual(controller.update(), 800)
+
+    def test_slow_decode(self):
+        controller = IntervalController(initial_interval_ms=100)
+        for _ in range(20):
+            controller.observe_decode_time(0.08)
+        self.assertTrue(controller.overloaded())
+
+
+class TestNotificationRateManager(unittest.IsolatedAsyncioTestCase):
+
+    def test_allocate(self):
+        self.assertEqual(allocate({"a": 100, "b": 100}, 100), {"a": 100, "b": 100})
+        self.assertEqual(allocate({"a": 100, "b": 100}, 10), {"a": 200, "b": 200})
+
+    def test_allocate_shares_budget_of_capped_hubs(self):
+        # "a" can only be slowed down to 125 ms, so "b" is slowed down more
+        allocated = allocate({"a": 100, "b": 100}, 10, {"a": 125, "b": 1000})
+        self.assertEqual(allocated["a"], 125)
+        self.assertAlmostEqual(allocated["b"], 500)
+        # the budget cannot be met with every hub at its cap
+        allocated = allocate({"a": 100, "b": 100}, 1, {"a": 125, "b": 1000})
+        self.assertEqual(allocated, {"a": 125, "b": 1000})
+
+    async def test_retune(self):
+        sent = []
+
+        async def send_request(message, response_type):
+            sent.append(message.interval_ms)
+            return DeviceNotificationResponse(True)
+
+        manager = NotificationRateManager(max_per_second=20)
+        controllers = [
+            manager.add_hub(hub, send_request, initial_interval_ms=100)
+            for hub in range(4)
+        ]
+        await manager.retune()
+        # 4 hubs wanting 90 ms intervals, scaled to stay within 20 per second
+        self.assertEqual(manager.intervals, {hub: 200 for hub in range(4)})
+        self.assertEqual(len(sent), 4)
+        # the controllers continue from the intervals the hubs use
+        self.assertEqual([c.interval_ms for c in controllers], [200] * 4)
+
+        # small changes are not sent to the hubs
+        await manager.retune()
+        self.assertEqual(len(sent), 4)
+        self.assertFalse(manager.over_budget)
+
+    async def test_retune_continues_if_a_hub_fails(self):
+        async def send_request(message, response_type):
+            return DeviceNotificationResponse(True)
+
+        async def disconnected(message, response_type):
+            raise ConnectionError("Connection closed")
+
+        manager = NotificationRateManager(max_per_second=1)
+        manager.add_hub("a", send_request, max_interval_ms=500)
+        manager.add_hub("b", disconnected, max_interval_ms=500)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            await manager.retune()
+        self.assertEqual(manager.intervals, {"a": 500})
+        self.assertTrue(manager.over_budget)
+        self.assertIn("Connection closed", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import struct
+import unittest
+import sys
+
+sys.path.append("..")
+from cobs import pack
+from messages import ConsoleNotification, DEVICE_MESSAGE_MAP, DeviceNotification
+from router import IMU, MOTOR, PORT_A, PORT_B, MessageRouter
+
+MOTOR_FORMAT = DEVICE_MESSAGE_MAP[MOTOR][1]
+
+
+def motor(port, position):
+    return struct.pack(MOTOR_FORMAT, MOTOR, port, 48, 0, 0, 0, position)
+
+
+def notification(*records):
+    payload = b"".join(records)
+    return pack(struct.pack("<BH", DeviceNotification.ID, len(payload)) + payload)
+
+
+def console(text):
+    return pack(b"\x21" + text + b"\0")
+
+
+class TestMessageRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = MessageRouter()
+        self.received = []
+
+    def test_drops_frames_without_subscribers(self):
+        self.router.subscribe(ConsoleNotification, self.received.append)
+        self.assertFalse(self.router.on_frame(notification(motor(PORT_A, 1))))
+        # an invalid message is dropped without being decoded
+        self.assertFalse(self.router.on_frame(pack(b"\xfe")))
+        self.assertTrue(self.router.on_frame(console(b"hi")))
+        self.assertEqual([m.text for m in self.received], ["hi"])
+        self.assertEqual((self.router.dispatched, self.router.dropped), (1, 2))
+
+    def test_device_messages_by_port(self):
+        port_a, all_ports = [], []
+        self.router.subscribe_device(MOTOR, port_a.append, port=PORT_A)
+        self.router.subscribe_device(MOTOR, all_ports.append)
+        battery = struct.pack("<BB", 0x00, 100)
+        self.router.on_frame(notification(battery, motor(PORT_A, 1), motor(PORT_B, 2)))
+        self.assertEqual([values[-1] for values in port_a], [1])
+        self.assertEqual([values[-1] for values in all_ports], [1, 2])
+
+    def test_device_and_message_subscribers(self):
+        motors = []
+        self.router.subscribe_device(MOTOR, motors.append)
+        self.router.subscribe(DeviceNotification, self.received.append)
+        self.router.on_frame(notification(motor(PORT_B, 5)))
+        self.assertEqual(len(motors), 1)
+        self.assertEqual(self.received[0].messages, [("Motor", motors[0])])
+
+    def test_unsubscribe(self):
+        unsubscribe = self.router.subscribe_all(self.received.append)
+        self.assertTrue(self.router.on_frame(console(b"a")))
+        unsubscribe()
+        self.assertFalse(self.router.on_frame(console(b"b")))
+        self.assertEqual(len(self.received), 1)
+
+    def test_invalid_subscriptions(self):
+        with self.assertRaises(ValueError):
+            self.router.subscribe_device(0x7F, self.received.append)
+        with self.assertRaises(ValueError):
+            self.router.subscribe_device(IMU, self.received.append, port=PORT_A)
+
+
+if __name__ == "__main__":
+    unittest.main()
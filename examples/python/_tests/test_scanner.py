@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.append("..")
+import scanner
+from scanner import SERVICE, Discovery
+
+
+def advertisement(address, rssi, service_uuids=(SERVICE,)):
+    device = SimpleNamespace(address=address)
+    adv = SimpleNamespace(rssi=rssi, service_uuids=list(service_uuids))
+    return device, adv
+
+
+class TestDiscovery(unittest.IsolatedAsyncioTestCase):
+
+    async def collect(self, discovery, timeout=0.5, limit=None):
+        return [device.address async for device, _ in discovery.hubs(timeout, limit)]
+
+    async def test_ranked_and_deduplicated(self):
+        discovery = Discovery(window=0.05)
+        for address, rssi in (("A", -80), ("B", -40), ("A", -30), ("C", -60)):
+            discovery.on_advertisement(*advertisement(address, rssi))
+        discovery.on_advertisement(*advertisement("D", -10, service_uuids=()))
+        self.assertEqual(await self.collect(discovery, 0.2), ["B", "C", "A"])
+
+    async def test_yields_while_scanning(self):
+        discovery = Discovery(window=0.01)
+        discovery.on_advertisement(*advertisement("A", -50))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, discovery.on_advertisement, *advertisement("B", -20))
+        self.assertEqual(await self.collect(discovery), ["A", "B"])
+
+    async def test_limit(self):
+        discovery = Discovery(window=0.01)
+        for address in "ABC":
+            discovery.on_advertisement(*advertisement(address, -50))
+        start = asyncio.get_running_loop().time()
+        self.assertEqual(len(await self.collect(discovery, 10.0, limit=2)), 2)
+        self.assertLess(asyncio.get_running_loop().time() - start, 1.0)
+
+
+class TestFindHub(unittest.IsolatedAsyncioTestCase):
+
+    async def test_scanning_stops_before_returning(self):
+        scanning = False
+
+        async def discover(timeout, limit=None):
+            nonlocal scanning
+            scanning = True
+            try:
+                for address in "AB":
+                    yield advertisement(address, -50)
+            finally:
+                scanning = False
+
+        with mock.patch.object(scanner, "discover", discover):
+            device = await scanner.find_hub(1.0)
+        self.assertEqual(device.address, "A")
+        self.assertFalse(scanning)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+import sys
+
+sys.path.append("..")
+from messages import ClearSlotRequest, ProgramFlowRequest, TransferChunkRequest
+from scheduler import BULK, CONTROL, INTERACTIVE, SendScheduler, priority
+
+
+class TestSendScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.written = []
+
+        async def write_frame(frame):
+            await asyncio.sleep(0.001)
+            self.written.append(frame)
+
+        self.scheduler = SendScheduler(write_frame)
+
+    async def asyncTearDown(self):
+        await self.scheduler.close()
+
+    def test_priority(self):
+        self.assertEqual(priority(ProgramFlowRequest(stop=True, slot=0)), CONTROL)
+        self.assertEqual(priority(ClearSlotRequest(0)), INTERACTIVE)
+        self.assertEqual(priority(TransferChunkRequest(0, b"")), BULK)
+
+    async def test_control_preempts_bulk(self):
+        self.scheduler.start()
+        bulk = [
+            asyncio.create_task(self.scheduler.send(b"bulk%d" % i, BULK))
+            for i in range(10)
+        ]
+        await asyncio.sleep(0.0025)
+        await self.scheduler.send(b"stop", CONTROL)
+        # only frames already being written may go before the control frame
+        self.assertLessEqual(self.written.index(b"stop"), 3)
+        await asyncio.gather(*bulk)
+        self.assertEqual(len(self.written), 11)
+
+    async def test_bulk_not_starved(self):
+        sends = [self.scheduler.send(b"i", INTERACTIVE) for _ in range(12)]
+        sends += [self.scheduler.send(b"b", BULK) for _ in range(3)]
+        tasks = [asyncio.create_task(s) for s in sends]
+        await asyncio.sleep(0)
+        self.scheduler.start()
+        await asyncio.gather(*tasks)
+        self.assertEqual(b"".join(self.written[:8]), b"iiibiiib")
+
+    async def test_close_fails_frame_being_written(self):
+        scheduler = SendScheduler(lambda frame: asyncio.Event().wait())
+        scheduler.start()
+        send = asyncio.create_task(scheduler.send(b"stuck"))
+        await asyncio.sleep(0.001)
+        await scheduler.close()
+        with self.assertRaises(ConnectionError):
+            await asyncio.wait_for(send, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
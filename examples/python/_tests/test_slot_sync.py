@@ -0,0 +1,85 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import sys
+
+sys.path.append("..")
+from messages import (
+    ClearSlotRequest,
+    ClearSlotResponse,
+    StartFileUploadRequest,
+    StartFileUploadResponse,
+    TransferChunkRequest,
+    TransferChunkResponse,
+)
+from slot_sync import SlotManifest, programs_in, sync
+
+UUID = bytes(range(16))
+
+
+class FakeHub:
+    """Records the slots cleared and uploaded."""
+
+    def __init__(self):
+        self.cleared = []
+
+    async def send_request(self, message, response_type):
+        if isinstance(message, ClearSlotRequest):
+            self.cleared.append(message.slot)
+            return ClearSlotResponse(True)
+        if isinstance(message, StartFileUploadRequest):
+            return StartFileUploadResponse(True)
+        if isinstance(message, TransferChunkRequest):
+            return TransferChunkResponse(True)
+        raise AssertionError(message)
+
+
+class TestSlotSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.programs = os.path.join(self.tmp.name, "programs")
+        os.mkdir(self.programs)
+        self.manifest_path = os.path.join(self.tmp.name, "slots.json")
+        self.write("0_hello.py", "print('hello')")
+        self.write("3_drive.py", "print('drive')")
+        self.write("notes.py", "# not a program")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.programs, name), "w") as f:
+            f.write(text)
+
+    def sync(self):
+        hub = FakeHub()
+        manifest = SlotManifest(self.manifest_path)
+        uploaded = asyncio.run(
+            sync(hub.send_request, self.programs, UUID, 16, manifest)
+        )
+        self.assertEqual(hub.cleared, uploaded)
+        return uploaded
+
+    def test_programs_in(self):
+        self.assertEqual(list(programs_in(self.programs)), [0, 3])
+        self.write("3-other.py", "")
+        with self.assertRaises(ValueError):
+            programs_in(self.programs)
+
+    def test_only_changed_slots_uploaded(self):
+        self.assertEqual(self.sync(), [0, 3])
+        self.assertEqual(self.sync(), [])
+        self.write("3_drive.py", "print('drive faster')")
+        self.assertEqual(self.sync(), [3])
+
+    def test_manifest_per_hub(self):
+        self.sync()
+        manifest = SlotManifest(self.manifest_path)
+        self.assertEqual(manifest.get(UUID, 0)["file"], "0_hello.py")
+        self.assertIsNone(manifest.get(bytes(16), 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
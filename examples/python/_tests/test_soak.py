@@ -0,0 +1,29 @@
+import unittest
+import sys
+
+sys.path.append("..")
+from soak import SimulatedHub, SoakLimits, soak
+
+
+class TestSoak(unittest.IsolatedAsyncioTestCase):
+
+    async def test_short_soak(self):
+        hub = SimulatedHub(loss_every=0)
+        samples = await soak(3000, samples=2, hub=hub)
+        self.assertEqual(len(samples), 3)
+        self.assertGreaterEqual(samples[-1].frames, 3000)
+        self.assertEqual(samples[-1].pending, 0)
+        self.assertGreater(samples[-1].p50, 0)
+        self.assertEqual(SoakLimits().failures(samples[0], samples[-1]), [])
+
+    async def test_limits(self):
+        samples = await soak(500, samples=1, hub=SimulatedHub(loss_every=0))
+        first, last = samples[0], samples[-1]
+        last.objects = first.objects + 100
+        last.p99 = 1.0
+        failures = SoakLimits(objects=10).failures(first, last)
+        self.assertEqual(len(failures), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
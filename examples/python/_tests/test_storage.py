@@ -0,0 +1,48 @@
+import os
+import tempfile
+import threading
+import unittest
+import sys
+from pathlib import Path
+
+sys.path.append("..")
+from storage import write_atomic
+
+
+class TestWriteAtomic(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "sub" / "data.json"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replaces_file(self):
+        write_atomic(self.path, b"old")
+        write_atomic(self.path, b"new")
+        self.assertEqual(self.path.read_bytes(), b"new")
+        self.assertEqual(os.listdir(self.path.parent), ["data.json"])
+
+    def test_concurrent_writers(self):
+        errors = []
+
+        def write(i):
+            try:
+                for _ in range(50):
+                    write_atomic(self.path, b"%d" % i * 1000)
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertIn(self.path.read_bytes(), [b"%d" % i * 1000 for i in range(4)])
+        self.assertEqual(os.listdir(self.path.parent), ["data.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import struct
+import unittest
+import sys
+
+import numpy as np
+
+sys.path.append("..")
+from messages import DEVICE_MESSAGE_MAP, DeviceNotification
+from telemetry import HubTelemetry
+
+IMU_FORMAT = DEVICE_MESSAGE_MAP[0x01][1]
+MOTOR_FORMAT = DEVICE_MESSAGE_MAP[0x0A][1]
+
+
+def imu(yaw, accel_z=0):
+    return struct.pack(IMU_FORMAT, 0x01, 0, 0, yaw, 0, 0, 0, 0, accel_z, 0, 0, 0)
+
+
+def motor(port, position):
+    return struct.pack(MOTOR_FORMAT, 0x0A, port, 48, 0, 0, 0, position)
+
+
+class TestHubTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.telemetry = HubTelemetry(capacity=8)
+
+    def test_records_imu_and_motors(self):
+        battery = struct.pack("<BB", 0x00, 100)
+        payload = battery + imu(10) + motor(0, 100) + motor(2, 200)
+        self.assertEqual(self.telemetry.feed(payload, timestamp=1.0), 3)
+        self.assertEqual(self.telemetry.imu.field("yaw").tolist(), [10])
+        self.assertEqual(sorted(self.telemetry.motors), [0, 2])
+        self.assertEqual(self.telemetry.motors[2].field("position").tolist(), [200])
+
+        # the records match what DeviceNotification decodes
+        message = DeviceNotification(len(payload), payload)
+        _, values = self.telemetry.imu.window()
+        self.assertEqual(values[0].tolist(), message.messages[1][1])
+
+    def test_unknown_message(self):
+        with self.assertRaises(ValueError):
+            self.telemetry.feed(imu(1) + b"\x7f\x00")
+        self.assertEqual(len(self.telemetry.imu), 1)
+
+    def test_windows_after_wrapping(self):
+        for i in range(20):
+            self.telemetry.feed(imu(i), timestamp=i / 10)
+        buffer = self.telemetry.imu
+        self.assertEqual(len(buffer), 8)
+        self.assertEqual(buffer.field("yaw").tolist(), list(range(12, 20)))
+        self.assertEqual(buffer.field("yaw", 3).tolist(), [17, 18, 19])
+        times, values = buffer.downsample(3)
+        self.assertEqual(values["yaw"].tolist(), [13, 16, 19])
+        np.testing.assert_allclose(times, [1.3, 1.6, 1.9])
+        # windows are views into the buffer, not copies
+        self.assertFalse(buffer.field("yaw").flags.owndata)
+
+    def test_aggregates(self):
+        for i, yaw in enumerate([1, -3, 5, 7]):
+            self.telemetry.feed(imu(yaw, accel_z=yaw), timestamp=i * 0.5)
+        buffer = self.telemetry.imu
+        self.assertEqual(buffer.mean("yaw"), 2.5)
+        self.assertEqual(buffer.min("yaw"), -3)
+        self.assertEqual(buffer.max("yaw", 2), 7)
+        self.assertAlmostEqual(buffer.rms("accel_z"), np.sqrt((1 + 9 + 25 + 49) / 4))
+        self.assertEqual(buffer.derivative("yaw").tolist(), [-8, 16, 4])
+        self.assertEqual(buffer.rolling_mean("yaw", 2).tolist(), [-1, 1, 6])
+
+    def test_empty(self):
+        times, values = self.telemetry.imu.downsample(2)
+        self.assertEqual(len(times), 0)
+        self.assertEqual(len(values), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import contextlib
+import io
+import os
+import unittest
+import sys
+
+sys.path.append("..")
+from messages import TunnelMessage, deserialize
+from tunnel import MAX_DATAGRAM_SIZE, SEGMENT, TunnelChannel
+
+MAX_MESSAGE_SIZE = 64
+
+
+class TestTunnelChannel(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sizes = []
+
+        # loop messages back to a second channel, as if sent by the hub
+        async def send_message(message):
+            data = message.serialize()
+            self.sizes.append(len(data))
+            self.receiver.receive(deserialize(data))
+
+        self.sender = TunnelChannel(
+            send_message, MAX_MESSAGE_SIZE, delay=0.01, framed=True
+        )
+        self.receiver = TunnelChannel(send_message, MAX_MESSAGE_SIZE, framed=True)
+
+    async def test_batches_small_datagrams(self):
+        for i in range(10):
+            await self.sender.send(b"%d" % i)
+        self.assertEqual(self.sender.messages_sent, 0)
+        await self.sender.flush()
+        self.assertEqual(self.sender.messages_sent, 1)
+        for i in range(10):
+            self.assertEqual(await self.receiver.recv(), b"%d" % i)
+
+    async def test_fragments_large_datagrams(self):
+        data = os.urandom(1000)
+        await self.sender.send(data)
+        await self.sender.send(b"after")
+        await asyncio.sleep(0.05)  # flushed on deadline
+        self.assertEqual(await self.receiver.recv(), data)
+        self.assertEqual(await self.receiver.recv(), b"after")
+        self.assertEqual(max(self.sizes), MAX_MESSAGE_SIZE)
+        # every message but the last is filled completely
+        self.assertEqual(set(self.sizes[:-1]), {MAX_MESSAGE_SIZE})
+
+    async def test_stream(self):
+        await self.sender.write(b"abc")
+        await self.sender.write(b"def")
+        await self.sender.flush()
+        self.assertEqual(await self.receiver.read(), b"abcdef")
+
+    async def test_deadline_flush_errors_are_reported(self):
+        async def send_message(message):
+            raise ConnectionError("Connection closed")
+
+        channel = TunnelChannel(send_message, MAX_MESSAGE_SIZE, delay=0.01)
+        await channel.write(b"abc")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            await asyncio.sleep(0.05)
+        self.assertEqual(output.getvalue(), "Error: Connection closed\n")
+
+    async def test_close_sends_pending_data(self):
+        await self.sender.send(b"abc")
+        await self.sender.close()
+        self.assertEqual(await self.receiver.recv(), b"abc")
+
+    async def test_max_rate(self):
+        self.sender.max_rate = 61 * 20  # 20 full messages per second
+        start = asyncio.get_running_loop().time()
+        await self.sender.send(bytes(61 * 5))
+        await self.sender.flush()
+        self.assertGreater(asyncio.get_running_loop().time() - start, 0.2)
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            self.receiver.receive(TunnelMessage(b"\x05"))
+        with self.assertRaises(ValueError):
+            self.receiver.receive(TunnelMessage(SEGMENT.pack(10, 0) + b"short"))
+
+    def test_datagram_size_limit(self):
+        segment = SEGMENT.pack(60000, 0) + bytes(60000)
+        self.receiver.receive(TunnelMessage(segment))
+        with self.assertRaises(ValueError):
+            self.receiver.receive(TunnelMessage(segment))
+        self.assertLessEqual(len(self.receiver._partial), MAX_DATAGRAM_SIZE)
+
+
+class TestUnframedTunnelChannel(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.messages = []
+
+        async def send_message(message):
+            self.messages.append(message.payload)
+
+        self.channel = TunnelChannel(send_message, MAX_MESSAGE_SIZE)
+
+    async def test_payloads_are_received_as_is(self):
+        for _ in range(1000):
+            self.channel.receive(TunnelMessage(b"hello from hub program"))
+        self.assertEqual(len(self.channel._partial), 0)
+        self.assertEqual(await self.channel.recv(), b"hello from hub program")
+        self.assertEqual(len(await self.channel.read()), 999 * 22)
+
+    async def test_stream_is_sent_as_is(self):
+        data = os.urandom(200)
+        await self.channel.write(data[:10])
+        await self.channel.write(data[10:])
+        await self.channel.flush()
+        self.assertEqual(b"".join(self.messages), data)
+        self.assertEqual(
+            [len(m) for m in self.messages], [MAX_MESSAGE_SIZE - 3] * 3 + [17]
+        )
+
+    async def test_datagrams_are_not_batched(self):
+        await self.channel.write(b"stream")
+        await self.channel.send(b"first")
+        await self.channel.send(bytes(100))
+        self.assertEqual(
+            self.messages,
+            [b"stream", b"first", bytes(MAX_MESSAGE_SIZE - 3), bytes(39)],
+        )
+
+    async def test_bounded_receive_queue(self):
+        channel = TunnelChannel(
+            self.channel.send_message, MAX_MESSAGE_SIZE, max_incoming=3
+        )
+        for i in range(5):
+            channel.receive(TunnelMessage(b"%d" % i))
+        self.assertEqual(channel.dropped, 2)
+        self.assertEqual(await channel.read(), b"234")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,13 +9,16 @@ The script is heavily simplified and not suitable for production use.
 
 ----------------------------------------------------------------------
 
-After prompting for confirmation to continue, the script will simply connect to
-the first device it finds advertising the SPIKE™ Prime service UUID, and proceed
-with the following steps:
+After prompting for confirmation to continue, the script will connect to the hub
+it connected to last time, if it is available. Otherwise it will simply connect to
+the first device it finds advertising the SPIKE™ Prime service UUID. It then
+proceeds with the following steps:
 
     1. Request information about the device (e.g. max chunk size for file transfers)
+       The name, UUID and limits of the hub are cached on disk for the next run.
     2. Subscribe to device notifications (e.g. state of IMU, display, sensors, motors, etc.)
     3. Clear the program in a specific slot
+       (steps 3-5 are skipped if the same program was already uploaded to the slot)
     4. Request transfer of a new program file to the slot
     5. Transfer the program in chunks
     6. Start the program
@@ -25,35 +28,32 @@ Otherwise it will continue to run until the connection is lost or stopped by the
 (You can stop the script by pressing Ctrl+C in the terminal.)
 
 While the script is running, it will print information about the messages it sends and receives.
+
+The connection logic is in connection.py, which can be imported as a library,
+and cli.py provides the same steps as separate commands.
 """
 
+import asyncio
 import sys
-from typing import cast, TypeVar
-
-TMessage = TypeVar("TMessage", bound="BaseMessage")
 
-import cobs
-from messages import *
+from connection import connect, update_cache
 from crc import crc
+from hub_cache import HubCache
+from messages import (
+    ClearSlotRequest,
+    ClearSlotResponse,
+    DeviceNotification,
+    DeviceNotificationRequest,
+    DeviceNotificationResponse,
+    ProgramFlowRequest,
+    ProgramFlowResponse,
+    StartFileUploadRequest,
+    StartFileUploadResponse,
+)
+from minify import minify_cached
+from slot_sync import SlotManifest
+from transfer import TransferError, transfer_chunks
 
-import asyncio
-from bleak import BleakClient, BleakScanner
-from bleak.backends.characteristic import BleakGATTCharacteristic
-from bleak.backends.device import BLEDevice
-from bleak.backends.scanner import AdvertisementData
-
-
-SCAN_TIMEOUT = 10.0
-"""How long to scan for devices before giving up (in seconds)"""
-
-SERVICE = "0000fd02-0000-1000-8000-00805f9b34fb"
-"""The SPIKE™ Prime BLE service UUID"""
-
-RX_CHAR = "0000fd02-0001-1000-8000-00805f9b34fb"
-"""The UUID the hub will receive data on"""
-
-TX_CHAR = "0000fd02-0002-1000-8000-00805f9b34fb"
-"""The UUID the hub will transmit data on"""
 
 DEVICE_NOTIFICATION_INTERVAL_MS = 5000
 """The interval in milliseconds between device notifications"""
@@ -71,109 +71,53 @@ runloop.run(main())""".encode(
 )
 """The utf8-encoded example program to upload to the hub"""
 
-answer = input(
-    f"This example will override the program in slot {EXAMPLE_SLOT} of the first hub found. Do you want to continue? [Y/n] "
-)
-if answer.strip().lower().startswith("n"):
-    print("Aborted by user.")
-    sys.exit(0)
+MINIFY_PROGRAM = False
+"""Whether to strip comments, docstrings and whitespace from the program before uploading"""
 
 stop_event = asyncio.Event()
 
 async def main():
 
-    def match_service_uuid(device: BLEDevice, adv: AdvertisementData) -> bool:
-        return SERVICE.lower() in adv.service_uuids
+    # hubs connected to in previous runs, to avoid scanning when possible
+    cache = HubCache()
 
-    print(f"\nScanning for {SCAN_TIMEOUT} seconds, please wait...")
-    device = await BleakScanner.find_device_by_filter(
-        filterfunc=match_service_uuid, timeout=SCAN_TIMEOUT
-    )
-
-    if device is None:
-        print(
-            "No hubs detected. Ensure that a hub is within range, turned on, and awaiting connection."
-        )
-        sys.exit(1)
-
-    device = cast(BLEDevice, device)
-    print(f"Hub detected! {device}")
-
-    def on_disconnect(client: BleakClient) -> None:
+    def on_disconnect(_) -> None:
         print("Connection lost.")
         stop_event.set()
 
-    print("Connecting...")
-    async with BleakClient(device, disconnected_callback=on_disconnect) as client:
-        print("Connected!\n")
-
-        service = client.services.get_service(SERVICE)
-        rx_char = service.get_characteristic(RX_CHAR)
-        tx_char = service.get_characteristic(TX_CHAR)
-
-        # simple response tracking
-        pending_response: tuple[int, asyncio.Future] = (-1, asyncio.Future())
+    def on_notification(message: DeviceNotification) -> None:
+        # sort and print the messages in the notification
+        updates = list(message.messages)
+        updates.sort(key=lambda x: x[1])
+        lines = [f" - {x[0]:<10}: {x[1]}" for x in updates]
+        print("\n".join(lines))
 
-        # callback for when data is received from the hub
-        def on_data(_: BleakGATTCharacteristic, data: bytearray) -> None:
-            if data[-1] != 0x02:
-                # packet is not a complete message
-                # for simplicity, this example does not implement buffering
-                # and is therefore unable to handle fragmented messages
-                un_xor = bytes(map(lambda x: x ^ 3, data))  # un-XOR for debugging
-                print(f"Received incomplete message:\n {un_xor}")
-                return
-
-            data = cobs.unpack(data)
-            try:
-                message = deserialize(data)
-                print(f"Received: {message}")
-                if message.ID == pending_response[0]:
-                    pending_response[1].set_result(message)
-                if isinstance(message, DeviceNotification):
-                    # sort and print the messages in the notification
-                    updates = list(message.messages)
-                    updates.sort(key=lambda x: x[1])
-                    lines = [f" - {x[0]:<10}: {x[1]}" for x in updates]
-                    print("\n".join(lines))
-
-            except ValueError as e:
-                print(f"Error: {e}")
-
-        # enable notifications on the hub's TX characteristic
-        await client.start_notify(tx_char, on_data)
-
-        # to be initialized
-        info_response: InfoResponse = None
-
-        # serialize and pack a message, then send it to the hub
-        async def send_message(message: BaseMessage) -> None:
-            print(f"Sending: {message}")
-            payload = message.serialize()
-            frame = cobs.pack(payload)
+    # connect to the most recently used hub, or the first one found by scanning
+    try:
+        client, connection = await connect(
+            cache, on_disconnect=on_disconnect, verbose=True
+        )
+    except ConnectionError as e:
+        print(e)
+        sys.exit(1)
 
-            # use the max_packet_size from the info response if available
-            # otherwise, assume the frame is small enough to send in one packet
-            packet_size = info_response.max_packet_size if info_response else len(frame)
+    try:
+        print("Connected!\n")
+        send_request = connection.send_request
+        connection.router.subscribe(DeviceNotification, on_notification)
 
-            # send the frame in packets of packet_size
-            for i in range(0, len(frame), packet_size):
-                packet = frame[i : i + packet_size]
-                await client.write_gatt_char(rx_char, packet, response=False)
+        # console output from the program running on the hub, assembled into lines
+        async def print_console() -> None:
+            async for line in connection.console:
+                print(f"Console: {line}")
 
-        # send a message and wait for a response of a specific type
-        async def send_request(
-            message: BaseMessage, response_type: type[TMessage]
-        ) -> TMessage:
-            nonlocal pending_response
-            pending_response = (response_type.ID, asyncio.Future())
-            await send_message(message)
-            return await pending_response[1]
+        console_task = asyncio.create_task(print_console())
 
         # first message should always be an info request
         # as the response contains important information about the hub
         # and how to communicate with it
-        info_response = await send_request(InfoRequest(), InfoResponse)
+        # for a known hub, the cached limits are used until the response arrives
+        info_response = await connection.handshake(cache.info(client.address))
 
         # enable device notifications
         notification_response = await send_request(
@@ -184,37 +128,60 @@ async def main():
             print("Error: failed to enable notifications")
             sys.exit(1)
 
-        # clear the program in the example slot
-        clear_response = await send_request(
-            ClearSlotRequest(EXAMPLE_SLOT), ClearSlotResponse
-        )
-        if not clear_response.success:
-            print(
-                "ClearSlotRequest was not acknowledged. This could mean the slot was already empty, proceeding..."
+        # confirm the cached limits before transferring any files
+        # name and UUID only need to be requested the first time a hub is seen
+        await update_cache(connection, cache, client.address)
+        if vars(connection.info) != vars(info_response):
+            print("Hub limits differ from cached values, using new values.")
+            info_response = connection.info
+
+        # optionally reduce the size of the program to speed up the upload
+        program = EXAMPLE_PROGRAM
+        if MINIFY_PROGRAM:
+            minified = minify_cached(EXAMPLE_PROGRAM)
+            print(minified.report())
+            program = minified.data
+
+        # skip the upload if the program in the slot is already up to date
+        manifest = SlotManifest()
+        hub_uuid = cache.uuid(client.address)
+        if manifest.is_current(hub_uuid, EXAMPLE_SLOT, "program.py", program):
+            print("Program in slot is already up to date, skipping upload.")
+        else:
+            manifest.forget(hub_uuid, EXAMPLE_SLOT)
+            manifest.save()
+
+            # clear the program in the example slot
+            clear_response = await send_request(
+                ClearSlotRequest(EXAMPLE_SLOT), ClearSlotResponse
             )
-
-        # start a new file upload
-        program_crc = crc(EXAMPLE_PROGRAM)
-        start_upload_response = await send_request(
-            StartFileUploadRequest("program.py", EXAMPLE_SLOT, program_crc),
-            StartFileUploadResponse,
-        )
-        if not start_upload_response.success:
-            print("Error: start file upload was not acknowledged")
-            sys.exit(1)
-
-        # transfer the program in chunks
-        running_crc = 0
-        for i in range(0, len(EXAMPLE_PROGRAM), info_response.max_chunk_size):
-            chunk = EXAMPLE_PROGRAM[i : i + info_response.max_chunk_size]
-            running_crc = crc(chunk, running_crc)
-            chunk_response = await send_request(
-                TransferChunkRequest(running_crc, chunk), TransferChunkResponse
+            if not clear_response.success:
+                print(
+                    "ClearSlotRequest was not acknowledged. This could mean the slot was already empty, proceeding..."
+                )
+
+            # start a new file upload
+            program_crc = crc(program)
+            start_upload_response = await send_request(
+                StartFileUploadRequest("program.py", EXAMPLE_SLOT, program_crc),
+                StartFileUploadResponse,
             )
-            if not chunk_response.success:
-                print(f"Error: failed to transfer chunk {i}")
+            if not start_upload_response.success:
+                print("Error: start file upload was not acknowledged")
+                sys.exit(1)
+
+            # transfer the program in chunks of up to max_chunk_size bytes
+            try:
+                await transfer_chunks(
+                    send_request, program, info_response.max_chunk_size
+                )
+            except TransferError as e:
+                print(f"Error: {e}")
                 sys.exit(1)
 
+            manifest.record(hub_uuid, EXAMPLE_SLOT, "program.py", program)
+            manifest.save()
+
         # start the program
         start_program_response = await send_request(
             ProgramFlowRequest(stop=False, slot=EXAMPLE_SLOT), ProgramFlowResponse
@@ -225,9 +192,20 @@ async def main():
 
         # wait for the user to stop the script or disconnect the hub
         await stop_event.wait()
+        console_task.cancel()
+        await connection.close()
+    finally:
+        await client.disconnect()
 
 
 if __name__ == "__main__":
+    answer = input(
+        f"This example will override the program in slot {EXAMPLE_SLOT} of the hub it connects to. Do you want to continue? [Y/n] "
+    )
+    if answer.strip().lower().startswith("n"):
+        print("Aborted by user.")
+        sys.exit(0)
+
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,114 @@
+"""
+Example of reusing buffers for encoding and decoding frames, to avoid
+allocating new objects for every frame on hosts connected to many hubs.
+
+Buffers are grouped in size classes. A request is served from the smallest
+class that fits, and the buffer is returned to that class once it is no
+longer needed. Size classes matching the limits reported by each hub in its
+InfoResponse are added with `add_limits()`, so e.g. buffers for a full packet
+or a full message are not rounded up further than needed.
+
+A single pool can (and should) be shared by all connections of a process, as
+long as they run on the same event loop.
+
+Example usage::
+
+    buffer = pool.acquire(cobs.framed_length(payload))
+    size = cobs.pack_into(payload, buffer)
+    await write(memoryview(buffer)[:size])
+    pool.release(buffer)
+
+    print(pool.report())
+"""
+
+from __future__ import annotations
+
+import bisect
+
+from cobs import max_framed_length
+from messages import InfoResponse
+
+
+SIZE_CLASSES = (64, 256, 1024, 4096)
+"""Default buffer sizes"""
+
+MAX_FREE = 64
+"""Default number of free buffers kept per size class"""
+
+
+class BufferPool:
+    """
+    Pool of reusable bytearrays in a number of size classes.
+    """
+
+    def __init__(self, sizes=SIZE_CLASSES, max_free: int = MAX_FREE):
+        self.max_free = max_free
+        self.sizes: list[int] = []
+        self._free: dict[int, list[bytearray]] = {}
+        for size in sizes:
+            self.add_size_class(size)
+        self.hits = 0
+        self.misses = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+
+    def add_size_class(self, size: int) -> None:
+        if size not in self._free:
+            bisect.insort(self.sizes, size)
+            self._free[size] = []
+
+    def add_limits(self, info: InfoResponse) -> None:
+        """
+        Add size classes for the packets and messages of a hub.
+        """
+        self.add_size_class(info.max_packet_size)
+        self.add_size_class(max_framed_length(info.max_message_size))
+
+    def acquire(self, size: int) -> bytearray:
+        """
+        Return a buffer of at least `size` bytes. Its contents are undefined.
+        """
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        i = bisect.bisect_left(self.sizes, size)
+        if i == len(self.sizes):
+            # larger than any size class, not pooled
+            self.misses += 1
+            return bytearray(size)
+        free = self._free[self.sizes[i]]
+        if free:
+            self.hits += 1
+            return free.pop()
+        self.misses += 1
+        return bytearray(self.sizes[i])
+
+    def release(self, buffer: bytearray) -> None:
+        """
+        Return a buffer to the pool. It must not be used afterwards.
+        """
+        self.in_use -= 1
+        free = self._free.get(len(buffer))
+        if free is not None and len(free) < self.max_free:
+            free.append(buffer)
+
+    def discard(self, buffer: bytearray) -> None:
+        """
+        Give up a buffer that may still be in use, without reusing it.
+        """
+        self.in_use -= 1
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def report(self) -> str:
+        return (
+            f"{self.hits + self.misses} buffers requested, "
+            f"hit rate {100 * self.hit_rate:.1f}%, "
+            f"{self.in_use} in use (peak {self.peak_in_use})"
+        )
+
+
+DEFAULT_POOL = BufferPool()
+"""Pool shared by all connections that are not given their own"""
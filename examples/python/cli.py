@@ -0,0 +1,281 @@
+"""
+Command line tool for working with SPIKE™ Prime hubs, built on connection.py.
+
+    python cli.py scan                  list the hubs in range
+    python cli.py info                  print information about a hub
+    python cli.py upload FILE -s SLOT   upload a program to a slot
+    python cli.py run -s SLOT           start the program in a slot
+    python cli.py monitor               print device notifications and console output
+    python cli.py gateway               serve device notifications over WebSocket
+
+Commands that need a hub connect to the hub used last time if it is available,
+otherwise to the first hub found by scanning.
+
+The tool is meant to be called often from scripts, so only the standard
+library modules needed to parse the arguments are imported at startup. Each
+command imports what it needs (including asyncio and the BLE backend) when it
+runs, so e.g. `--help` or an invalid argument returns without that cost.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import sys
+
+
+def _run(coroutine_function, args: argparse.Namespace) -> int:
+    import asyncio
+
+    from transfer import TransferError
+
+    try:
+        from bleak.exc import BleakError
+    except ImportError:
+        # commands cannot connect to a hub without bleak, so cannot raise it
+        BleakError = OSError
+
+    try:
+        return asyncio.run(coroutine_function(args)) or 0
+    except KeyboardInterrupt:
+        print("Interrupted by user.")
+        return 130
+    except (OSError, BleakError, TransferError, ValueError) as e:
+        # OSError includes ConnectionError, and e.g. a port that is in use
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+@contextlib.asynccontextmanager
+async def _connect(args: argparse.Namespace, **kwargs):
+    """
+    Connect to a hub and complete the handshake, disconnecting on exit.
+    """
+    from connection import connect, update_cache
+    from hub_cache import HubCache
+
+    cache = HubCache()
+    client, connection = await connect(
+        cache, scan_timeout=args.timeout, verbose=args.verbose, **kwargs
+    )
+    try:
+        await connection.handshake(cache.info(client.address))
+        await update_cache(connection, cache, client.address)
+        yield client, connection, cache
+    finally:
+        await connection.close()
+        await client.disconnect()
+
+
+async def scan(args: argparse.Namespace) -> int:
+    from scanner import discover
+
+    found = 0
+    async for device, adv in discover(args.timeout, args.limit):
+        print(f"{device.address}  {adv.rssi:>4} dBm  {device.name or ''}")
+        found += 1
+    if not found:
+        print("No hubs detected.", file=sys.stderr)
+        return 1
+    return 0
+
+
+async def info(args: argparse.Namespace) -> int:
+    from hub_cache import firmware_version
+
+    async with _connect(args) as (client, connection, cache):
+        hub = cache.get(client.address)
+        print(f"Address:          {client.address}")
+        print(f"Name:             {hub.get('name')}")
+        print(f"UUID:             {hub.get('uuid')}")
+        print(f"Firmware:         {firmware_version(connection.info)}")
+        print(f"Max packet size:  {connection.info.max_packet_size}")
+        print(f"Max message size: {connection.info.max_message_size}")
+        print(f"Max chunk size:   {connection.info.max_chunk_size}")
+    return 0
+
+
+async def upload(args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from slot_sync import PROGRAM_FILE_NAME, SlotManifest, upload_program
+
+    program = Path(args.file).read_bytes()
+    if args.minify:
+        from minify import minify_cached
+
+        minified = minify_cached(program)
+        print(minified.report())
+        program = minified.data
+
+    async with _connect(args) as (client, connection, cache):
+        manifest = SlotManifest()
+        hub_uuid = cache.uuid(client.address)
+        if not args.force and manifest.is_current(
+            hub_uuid, args.slot, PROGRAM_FILE_NAME, program
+        ):
+            print("Program in slot is already up to date, skipping upload.")
+        else:
+            manifest.forget(hub_uuid, args.slot)
+            manifest.save()
+            await upload_program(
+                connection.send_request,
+                args.slot,
+                program,
+                connection.info.max_chunk_size,
+            )
+            manifest.record(hub_uuid, args.slot, PROGRAM_FILE_NAME, program)
+            manifest.save()
+            print(f"Uploaded {len(program)} bytes to slot {args.slot}.")
+        if args.run:
+            return await _start(connection, args.slot)
+    return 0
+
+
+async def _start(connection, slot: int) -> int:
+    from messages import ProgramFlowRequest, ProgramFlowResponse
+
+    response = await connection.send_request(
+        ProgramFlowRequest(stop=False, slot=slot), ProgramFlowResponse
+    )
+    if not response.success:
+        print("Error: failed to start program", file=sys.stderr)
+        return 1
+    return 0
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with _connect(args) as (_, connection, _):
+        return await _start(connection, args.slot)
+
+
+async def monitor(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from messages import (
+        DeviceNotification,
+        DeviceNotificationRequest,
+        DeviceNotificationResponse,
+    )
+
+    stopped = asyncio.Event()
+
+    def on_notification(message: DeviceNotification) -> None:
+        print(" ".join(f"{name}={values}" for name, values in message.messages))
+
+    def on_disconnect(client) -> None:
+        stopped.set()
+
+    async with _connect(args, on_disconnect=on_disconnect) as (_, connection, _):
+        connection.router.subscribe(DeviceNotification, on_notification)
+        response = await connection.send_request(
+            DeviceNotificationRequest(args.interval), DeviceNotificationResponse
+        )
+        if not response.success:
+            print("Error: failed to enable notifications", file=sys.stderr)
+            return 1
+
+        async def print_console() -> None:
+            async for line in connection.console:
+                print(f"Console: {line}")
+
+        console_task = asyncio.create_task(print_console())
+        await stopped.wait()
+        console_task.cancel()
+        print("Connection lost.")
+    return 0
+
+
+async def gateway(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from gateway import TelemetryGateway
+    from messages import DeviceNotificationRequest, DeviceNotificationResponse
+
+    stopped = asyncio.Event()
+
+    def on_disconnect(client) -> None:
+        stopped.set()
+
+    async with _connect(args, on_disconnect=on_disconnect) as (client, connection, _):
+        response = await connection.send_request(
+            DeviceNotificationRequest(args.interval), DeviceNotificationResponse
+        )
+        if not response.success:
+            print("Error: failed to enable notifications", file=sys.stderr)
+            return 1
+
+        telemetry = TelemetryGateway()
+        telemetry.attach(client.address, connection.router)
+        print(f"Serving on ws://{args.host}:{args.port}")
+        server = asyncio.create_task(telemetry.serve(args.host, args.port))
+        disconnected = asyncio.create_task(stopped.wait())
+        await asyncio.wait((server, disconnected), return_when=asyncio.FIRST_COMPLETED)
+        if server.done():
+            server.result()  # raises if the server could not be started
+        server.cancel()
+        print("Connection lost.")
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Work with SPIKE™ Prime hubs.")
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=10.0, help="scan timeout in seconds"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="print all messages"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("scan", help="list the hubs in range")
+    command.add_argument("-n", "--limit", type=int, help="stop after this many hubs")
+    command.set_defaults(function=scan)
+
+    command = commands.add_parser("info", help="print information about a hub")
+    command.set_defaults(function=info)
+
+    command = commands.add_parser("upload", help="upload a program to a slot")
+    command.add_argument("file", help="the program to upload")
+    command.add_argument("-s", "--slot", type=int, default=0)
+    command.add_argument(
+        "--minify", action="store_true", help="minify the program before uploading"
+    )
+    command.add_argument(
+        "--force", action="store_true", help="upload even if the slot is up to date"
+    )
+    command.add_argument("--run", action="store_true", help="start the program")
+    command.set_defaults(function=upload)
+
+    command = commands.add_parser("run", help="start the program in a slot")
+    command.add_argument("-s", "--slot", type=int, default=0)
+    command.set_defaults(function=run)
+
+    command = commands.add_parser(
+        "monitor", help="print device notifications and console output"
+    )
+    command.add_argument(
+        "-i", "--interval", type=int, default=1000, help="notification interval in ms"
+    )
+    command.set_defaults(function=monitor)
+
+    command = commands.add_parser(
+        "gateway", help="serve device notifications over WebSocket"
+    )
+    command.add_argument(
+        "-i", "--interval", type=int, default=100, help="notification interval in ms"
+    )
+    command.add_argument("--host", default="localhost")
+    command.add_argument("--port", type=int, default=8765)
+    command.set_defaults(function=gateway)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parser().parse_args(argv)
+    return _run(args.function, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Example of coalescing frames into as few BLE writes as possible.
+
+Frames are self-delimiting (each one ends with the 0x02 delimiter), so the
+hub does not need each write to contain exactly one frame. Instead of writing
+every frame on its own, pending frames are concatenated into packets of up to
+`max_packet_size` bytes.
+
+    * Full packets are written immediately.
+    * A partially filled packet is written when the caller asks for a flush,
+      or after a short deadline, whichever comes first.
+
+`write_frame()` shows the simplest way of honoring the packet size, writing
+each frame in packets of its own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+
+FLUSH_DELAY = 0.005
+"""How long a partially filled packet may wait for more frames (in seconds)"""
+
+
+async def write_frame(
+    write_packet: Callable[[bytes], Awaitable[None]],
+    frame: bytes,
+    packet_size: int | None = None,
+) -> None:
+    """
+    Write a single frame in packets of up to `packet_size` bytes.
+    """
+    # use the max_packet_size from the info response if available
+    # otherwise, assume the frame is small enough to send in one packet
+    packet_size = packet_size or len(frame)
+
+    # send the frame in packets of packet_size
+    for i in range(0, len(frame), packet_size):
+        await write_packet(frame[i : i + packet_size])
+
+
+class WriteCoalescer:
+    """
+    Buffers frames and writes them in packets of up to `packet_size` bytes.
+
+    Until `packet_size` is known (i.e. before the InfoResponse is received),
+    each frame is written as a single packet.
+    """
+
+    def __init__(
+        self,
+        write_packet: Callable[[bytes], Awaitable[None]],
+        packet_size: int | None = None,
+        delay: float = FLUSH_DELAY,
+    ):
+        self.write_packet = write_packet
+        self.packet_size = packet_size
+        self.delay = delay
+        self.frames_written = 0
+        self.packets_written = 0
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    async def write(self, frame: bytes, flush: bool = False) -> None:
+        """
+        Queue a frame for writing.
+        Returns once any full packets have been written; the remainder is
+        written by a later call, a flush, or when the deadline expires.
+        """
+        async with self._lock:
+            self._buffer += frame
+            self.frames_written += 1
+            if self.packet_size is None:
+                flush = True
+            else:
+                # send the frame in packets of packet_size
+                while len(self._buffer) >= self.packet_size:
+                    await self._write_packet(self.packet_size)
+            if flush:
+                await self._write_packet(len(self._buffer))
+
+            if not self._buffer:
+                self._cancel_timer()
+            elif self._timer is None:
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(self.delay, self._on_deadline)
+
+    async def flush(self) -> None:
+        """
+        Write any buffered data immediately.
+        """
+        async with self._lock:
+            self._cancel_timer()
+            await self._write_packet(len(self._buffer))
+
+    async def close(self) -> None:
+        """
+        Write any buffered data, after a flush started by the deadline.
+        """
+        self._cancel_timer()
+        if self._flush_task is not None:
+            # its error (if any) has already been reported
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    def _on_deadline(self) -> None:
+        self._timer = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._on_flushed)
+
+    def _on_flushed(self, task: asyncio.Task) -> None:
+        # nobody awaits a flush started by the deadline
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error: {task.exception()}")
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _write_packet(self, size: int) -> None:
+        if size == 0:
+            return
+        packet = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.packets_written += 1
+        await self.write_packet(packet)
@@ -6,6 +6,8 @@ This implementation prioritizes readability and simplicity over performance and
 should be used for educational purposes only.
 """
 
+import re
+
 DELIMITER = 0x02
 """Delimiter used to mark end of frame"""
 
@@ -21,6 +23,9 @@ MAX_BLOCK_SIZE = 84
 XOR = 3
 """XOR mask for encoding"""
 
+_ESCAPED = re.compile(rb"[\x00-\x02]")
+"""Matches the byte values that are escaped by the encoder"""
+
 
 def encode(data: bytes):
     """
@@ -118,3 +123,148 @@ def unpack(frame: bytes):
     # unframe and XOR
     unframed = bytes(map(lambda x: x ^ XOR, frame[start:-1]))
     return bytes(decode(unframed))
+
+
+def max_framed_length(size: int) -> int:
+    """
+    Return the largest possible length of the frame for `size` bytes of data,
+    e.g. to size buffers for the largest message a hub accepts.
+    """
+    # at most one code word per MAX_BLOCK_SIZE bytes, plus the initial
+    # code word and the delimiter
+    return size + size // MAX_BLOCK_SIZE + 2
+
+
+def _unescape(code: int):
+    """Decode code word, returning value and block size"""
+    if code == NO_DELIMITER:
+        # no delimiter in block
+        return None, MAX_BLOCK_SIZE + 1
+    value, block = divmod(code - COBS_CODE_OFFSET, MAX_BLOCK_SIZE)
+    if block == 0:
+        # maximum block size ending with delimiter
+        block = MAX_BLOCK_SIZE
+        value -= 1
+    return value, block
+
+
+def pack_into(data: bytes, buffer: bytearray) -> int:
+    """
+    Pack data like pack(), writing the frame into a buffer of at least
+    framed_length(data) bytes instead of allocating a new one.
+    Returns the length of the frame.
+    """
+    # same as encode(), with the XOR applied to each byte as it is written
+    code_index = 0  # index of incomplete code word
+    block = 1  # no. of bytes in block (incl. code word)
+    length = 1
+    for byte in data:
+        if byte > DELIMITER:
+            buffer[length] = byte ^ XOR
+            length += 1
+            block += 1
+
+        if byte <= DELIMITER or block > MAX_BLOCK_SIZE:
+            code = NO_DELIMITER
+            if byte <= DELIMITER:
+                code = byte * MAX_BLOCK_SIZE + block + COBS_CODE_OFFSET
+            buffer[code_index] = code ^ XOR
+            code_index = length
+            length += 1
+            block = 1
+
+    buffer[code_index] = (block + COBS_CODE_OFFSET) ^ XOR
+    buffer[length] = DELIMITER
+    return length + 1
+
+
+def unpack_into(frame: bytes, buffer: bytearray) -> int:
+    """
+    Unpack a frame like unpack(), writing the data into a buffer of at least
+    len(frame) bytes instead of allocating a new one.
+    Returns the length of the data.
+    """
+    start = 0
+    if frame[0] == 0x01:  # unused priority byte
+        start += 1
+    # same as decode(), with the XOR applied to each byte as it is read
+    length = 0
+    value, block = _unescape(frame[start] ^ XOR)
+    for i in range(start + 1, len(frame) - 1):
+        block -= 1
+        if block > 0:
+            buffer[length] = frame[i] ^ XOR
+            length += 1
+            continue
+
+        # block completed
+        if value is not None:
+            buffer[length] = value
+            length += 1
+
+        value, block = _unescape(frame[i] ^ XOR)
+
+    return length
+
+
+def peek(frame: bytes) -> int:
+    """
+    Return the first byte of the data in a frame (i.e. the message ID),
+    without decoding the rest of the frame.
+    """
+    start = 0
+    if frame[0] == 0x01:  # unused priority byte
+        start += 1
+    code = frame[start] ^ XOR
+    if code != NO_DELIMITER:
+        value, block = divmod(code - COBS_CODE_OFFSET, MAX_BLOCK_SIZE)
+        if block == 1:
+            # the first block holds only the code word, so the first byte
+            # is the delimiter value it replaced
+            return value
+    return frame[start + 1] ^ XOR
+
+
+def encoded_length(data: bytes) -> int:
+    """
+    Calculate the length of the encoded data, without encoding it.
+    """
+    # every byte results in one output byte (either as-is or as a code word),
+    # plus the initial code word and one more for every MAX_BLOCK_SIZE bytes
+    # in a row that do not need escaping
+    length = len(data) + 1
+    start = 0
+    # only the positions of the escaped bytes are needed, not copies of the runs
+    for match in _ESCAPED.finditer(data):
+        length += (match.start() - start) // MAX_BLOCK_SIZE
+        start = match.end()
+    return length + (len(data) - start) // MAX_BLOCK_SIZE
+
+
+def framed_length(data: bytes) -> int:
+    """
+    Calculate the length of the frame produced by pack(), without packing.
+    """
+    return encoded_length(data) + 1
+
+
+def plan_packets(
+    payloads: list[bytes], max_packet_size: int, max_message_size: int | None = None
+) -> list[tuple[int, int]]:
+    """
+    Plan how the frames for a sequence of messages are split into packets when
+    sent back to back, without packing them, e.g. to estimate how many writes
+    a batch of messages takes. This is not needed to send the messages.
+    Returns the start and end offset of each packet in the concatenated frames.
+    """
+    total = 0
+    for payload in payloads:
+        if max_message_size is not None and len(payload) > max_message_size:
+            raise ValueError(
+                f"Message too large: {len(payload)} > {max_message_size} bytes"
+            )
+        total += framed_length(payload)
+    return [
+        (start, min(start + max_packet_size, total))
+        for start in range(0, total, max_packet_size)
+    ]
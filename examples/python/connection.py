@@ -0,0 +1,347 @@
+"""
+Example of the connection logic for a SPIKE™ Prime hub, usable as a library.
+
+HubConnection holds the protocol state of a single connection and does not
+depend on the transport: packets received from the hub are passed to
+`on_packet()`, and packets to send are written with the `write_packet`
+function it is created with. This also makes it possible to use it without
+a hub, e.g. in tests.
+
+The BLE transport is only imported when a connection is actually made, so
+importing this module is fast, even for scripts that never connect to a hub.
+
+Example usage::
+
+    client, connection = await connect()
+    info = await connection.handshake()
+    await connection.send_request(ProgramFlowRequest(stop=False, slot=0), ProgramFlowResponse)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable, TypeVar
+
+import cobs
+from buffer_pool import DEFAULT_POOL, BufferPool
+from coalescer import WriteCoalescer
+from console import ConsoleStream
+from messages import (
+    BaseMessage,
+    ConsoleNotification,
+    DeviceUuidRequest,
+    DeviceUuidResponse,
+    GetHubNameRequest,
+    GetHubNameResponse,
+    InfoRequest,
+    InfoResponse,
+    TunnelMessage,
+)
+from router import MessageRouter
+from scheduler import SendScheduler, priority
+from tunnel import TunnelChannel
+
+if TYPE_CHECKING:
+    from bleak import BleakClient
+    from bleak.backends.device import BLEDevice
+    from hub_cache import HubCache
+
+TMessage = TypeVar("TMessage", bound=BaseMessage)
+
+
+SCAN_TIMEOUT = 10.0
+"""How long to scan for devices before giving up (in seconds)"""
+
+DIRECT_CONNECT_TIMEOUT = 3.0
+"""How long to try connecting to the last known hub before scanning instead (in seconds)"""
+
+RX_CHAR = "0000fd02-0001-1000-8000-00805f9b34fb"
+"""The UUID the hub will receive data on"""
+
+TX_CHAR = "0000fd02-0002-1000-8000-00805f9b34fb"
+"""The UUID the hub will transmit data on"""
+
+
+class HubConnection:
+    """
+    Protocol state of a connection to a hub.
+    """
+
+    def __init__(
+        self,
+        write_packet: Callable[[bytes], Awaitable[None]],
+        on_message: Callable[[BaseMessage], None] | None = None,
+        verbose: bool = False,
+        pool: BufferPool = DEFAULT_POOL,
+    ):
+        self.verbose = verbose
+        self.pool = pool
+        self.info: InfoResponse | None = None
+        self.info_request: asyncio.Future | None = None
+        self.console = ConsoleStream()
+        self.tunnel: TunnelChannel | None = None
+        self.coalescer = WriteCoalescer(write_packet)
+        self.scheduler = SendScheduler(self._write_frame)
+        # pending requests by response type, answered in the order they were sent
+        self._pending: dict[int, deque[asyncio.Future]] = {}
+        self._response_types: set[int] = set()
+
+        # frames are only decoded if something is subscribed to them
+        self.router = MessageRouter(pool)
+        if verbose:
+            self.router.subscribe_all(lambda message: print(f"Received: {message}"))
+        self.router.subscribe(
+            ConsoleNotification, lambda message: self.console.feed(message.payload)
+        )
+        if on_message is not None:
+            self.router.subscribe_all(on_message)
+        # data received so far for an incomplete frame
+        self._buffer = bytearray()
+
+    def start(self) -> None:
+        self.scheduler.start()
+
+    async def close(self) -> None:
+        if self.tunnel is not None:
+            await self.tunnel.close()
+        await self.scheduler.close()
+        await self.coalescer.close()
+        # requests still waiting for a response will never get one
+        for futures in self._pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+        self._pending.clear()
+
+    def pending_requests(self) -> int:
+        """
+        Return the number of requests waiting for a response.
+        """
+        return sum(map(len, self._pending.values()))
+
+    def on_packet(self, data: bytes) -> None:
+        """
+        Handle a packet received from the hub.
+        A packet may contain part of a frame, or several frames.
+        """
+        self._buffer += data
+        start = 0
+        try:
+            # frames are passed on as views into the buffer, without copying them
+            with memoryview(self._buffer) as view:
+                while True:
+                    end = self._buffer.find(cobs.DELIMITER, start)
+                    if end < 0:
+                        break
+                    # a frame is consumed even if handling it fails
+                    frame, start = view[start : end + 1], end + 1
+                    self._on_frame(frame)
+                    del frame
+        except BaseException:
+            # the traceback may still hold a view of the frame, which prevents
+            # resizing the buffer, so keep a copy of the remaining data instead
+            self._buffer = self._buffer[start:]
+            raise
+        del self._buffer[:start]
+
+    def _on_frame(self, frame: bytes) -> None:
+        try:
+            self.router.on_frame(frame)
+        except (ValueError, IndexError, struct.error) as e:
+            # malformed frame, e.g. empty or truncated
+            print(f"Error: {e}")
+
+    def _on_response(self, message: BaseMessage) -> None:
+        futures = self._pending.get(message.ID)
+        while futures:
+            future = futures.popleft()
+            if not future.done():
+                future.set_result(message)
+                break
+        if futures is not None and not futures:
+            del self._pending[message.ID]
+
+    async def _write_frame(self, frame: bytes) -> None:
+        # wait for more frames to fill the packet only if some are queued
+        await self.coalescer.write(frame, flush=not self.scheduler.pending())
+
+    async def send_message(self, message: BaseMessage) -> None:
+        """
+        Serialize and pack a message, then send it to the hub.
+        """
+        if self.verbose:
+            print(f"Sending: {message}")
+        payload = message.serialize()
+        # reject messages that are too large for the hub before encoding them
+        if self.info and len(payload) > self.info.max_message_size:
+            raise ValueError(
+                f"Message too large: {len(payload)} > {self.info.max_message_size}"
+            )
+        buffer = self.pool.acquire(cobs.framed_length(payload))
+        frame = memoryview(buffer)[: cobs.pack_into(payload, buffer)]
+        try:
+            await self.scheduler.send(frame, priority(message))
+        except asyncio.CancelledError:
+            # the frame may still be written after the sender stopped waiting,
+            # so the buffer must not be reused
+            self.pool.discard(buffer)
+            raise
+        except Exception:
+            self.pool.release(buffer)
+            raise
+        # the frame has been copied into a packet by now
+        self.pool.release(buffer)
+
+    async def send_request(
+        self, message: BaseMessage, response_type: type[TMessage]
+    ) -> TMessage:
+        """
+        Send a message and wait for a response of a specific type.
+        """
+        if response_type.ID not in self._response_types:
+            self._response_types.add(response_type.ID)
+            self.router.subscribe(response_type, self._on_response)
+        future = asyncio.get_running_loop().create_future()
+        futures = self._pending.setdefault(response_type.ID, deque())
+        futures.append(future)
+        try:
+            await self.send_message(message)
+            return await future
+        finally:
+            # forget the request if sending failed, or if the caller stopped
+            # waiting (e.g. after a timeout) before the response arrived
+            future.cancel()
+            futures = self._pending.get(response_type.ID)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._pending[response_type.ID]
+
+    def _apply_info(self, info: InfoResponse) -> None:
+        self.info = info
+        self.coalescer.packet_size = info.max_packet_size
+        self.pool.add_limits(info)
+        if self.tunnel is None:
+            self.tunnel = TunnelChannel(self.send_message, info.max_message_size)
+            self.router.subscribe(TunnelMessage, self.tunnel.receive)
+
+    async def handshake(self, cached_info: InfoResponse | None = None) -> InfoResponse:
+        """
+        Send the InfoRequest that must be the first message on a connection.
+
+        If limits cached from an earlier connection to the hub are given, they
+        are used right away, without waiting for the response. The confirmed
+        limits can be awaited with `info_request`, and replace the cached ones
+        when they arrive.
+        """
+
+        def on_response(request: asyncio.Future) -> None:
+            if not request.cancelled() and request.exception() is None:
+                self._apply_info(request.result())
+
+        self.info_request = asyncio.ensure_future(
+            self.send_request(InfoRequest(), InfoResponse)
+        )
+        self.info_request.add_done_callback(on_response)
+        if cached_info is None:
+            return await self.info_request
+        self._apply_info(cached_info)
+        return cached_info
+
+
+async def update_cache(
+    connection: HubConnection, cache: HubCache, address: str
+) -> None:
+    """
+    Wait for the handshake to be confirmed, then record the limits of the hub
+    in the cache. The name and UUID of the hub are requested the first time
+    it is seen.
+    """
+    info = await connection.info_request
+    if cache.uuid(address) is None:
+        name_response = await connection.send_request(
+            GetHubNameRequest(), GetHubNameResponse
+        )
+        uuid_response = await connection.send_request(
+            DeviceUuidRequest(), DeviceUuidResponse
+        )
+        cache.update(address, name_response.name, uuid_response.uuid)
+    else:
+        cache.update(address)
+    cache.store_info(address, info)
+    cache.save()
+
+
+async def connect_ble(
+    device: BLEDevice | str,
+    on_message: Callable[[BaseMessage], None] | None = None,
+    on_disconnect: Callable[[BleakClient], None] | None = None,
+    timeout: float = SCAN_TIMEOUT,
+    verbose: bool = False,
+) -> tuple[BleakClient, HubConnection]:
+    """
+    Connect to a hub over BLE and enable notifications from it.
+    """
+    from bleak import BleakClient
+    from scanner import SERVICE
+
+    client = BleakClient(device, disconnected_callback=on_disconnect, timeout=timeout)
+    await client.connect()
+
+    connection = None
+    try:
+        service = client.services.get_service(SERVICE)
+        if service is None:
+            raise ConnectionError(f"{client.address} is not a SPIKE™ Prime hub")
+        rx_char = service.get_characteristic(RX_CHAR)
+        tx_char = service.get_characteristic(TX_CHAR)
+
+        async def write_packet(packet: bytes) -> None:
+            await client.write_gatt_char(rx_char, packet, response=False)
+
+        connection = HubConnection(write_packet, on_message, verbose)
+        connection.start()
+        await client.start_notify(tx_char, lambda _, data: connection.on_packet(data))
+    except BaseException:
+        # do not leave a hub connected that cannot be used
+        if connection is not None:
+            await connection.close()
+        await client.disconnect()
+        raise
+    return client, connection
+
+
+async def connect(
+    cache: HubCache | None = None,
+    scan_timeout: float = SCAN_TIMEOUT,
+    direct_timeout: float = DIRECT_CONNECT_TIMEOUT,
+    **kwargs,
+) -> tuple[BleakClient, HubConnection]:
+    """
+    Connect to the most recently used hub in the cache if it is available
+    within `direct_timeout`, otherwise to the first hub found by scanning.
+    Keyword arguments are passed on to connect_ble().
+    """
+    from bleak.exc import BleakError
+    from scanner import find_hub
+
+    addresses = cache.addresses() if cache is not None else []
+    if addresses:
+        print(f"Connecting to last known hub {addresses[0]}...")
+        try:
+            return await connect_ble(
+                addresses[0], **dict(kwargs, timeout=direct_timeout)
+            )
+        except (BleakError, ConnectionError, asyncio.TimeoutError):
+            print("Last known hub is not available.")
+
+    print(f"Scanning for {scan_timeout} seconds, please wait...")
+    device = await find_hub(scan_timeout)
+    if device is None:
+        raise ConnectionError(
+            "No hubs detected. Ensure that a hub is within range, turned on, and awaiting connection."
+        )
+    print(f"Hub detected! {device}")
+    return await connect_ble(device, **kwargs)
@@ -0,0 +1,121 @@
+"""
+Example of assembling console output from a running program into lines.
+
+Console output arrives in ConsoleNotification messages, which may split a line
+(or even a multi-byte UTF-8 character) across several notifications. The
+payloads of a connection's notifications are fed to a ConsoleStream, which
+decodes them incrementally and keeps complete lines in a bounded buffer.
+Output without newlines does not accumulate without bounds either: a line
+longer than `max_line_length` is emitted in parts before it ends, which are
+counted in `broken_lines`.
+
+Lines can be consumed one at a time with ``async for``, or in batches::
+
+    while True:
+        await console.wait()
+        for line in console.drain():
+            print(line)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+from collections import deque
+from typing import AsyncIterator
+
+
+MAX_LINES = 1000
+"""Default number of lines to buffer before discarding the oldest ones"""
+
+MAX_LINE_LENGTH = 4096
+"""Default length after which an incomplete line is emitted in parts"""
+
+
+class ConsoleStream:
+    """
+    Incremental decoder of console output into complete lines.
+    """
+
+    def __init__(
+        self, max_lines: int = MAX_LINES, max_line_length: int = MAX_LINE_LENGTH
+    ):
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.max_line_length = max_line_length
+        self.dropped = 0
+        self.broken_lines = 0
+        self._decoder = codecs.getincrementaldecoder("utf8")(errors="replace")
+        self._partial: list[str] = []
+        self._partial_length = 0
+        self._available = asyncio.Event()
+
+    def feed(self, data: bytes) -> None:
+        """
+        Add the payload of a ConsoleNotification to the stream.
+        """
+        text = self._decoder.decode(data)
+        if "\n" not in text:
+            if text:
+                self._partial.append(text)
+                self._partial_length += len(text)
+        else:
+            lines = text.split("\n")
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+            # the last element is the start of the next line (possibly empty)
+            self._partial = [lines.pop()]
+            self._partial_length = len(self._partial[0])
+            self._append(lines)
+
+        if self._partial_length >= self.max_line_length:
+            # e.g. a progress bar redrawn with "\r", or binary output
+            line = "".join(self._partial)
+            n = self.max_line_length
+            self._partial = [line[len(line) - len(line) % n :]]
+            self._partial_length = len(self._partial[0])
+            parts = [line[i : i + n] for i in range(0, len(line) - n + 1, n)]
+            self.broken_lines += len(parts)
+            self._append(parts)
+
+    def flush(self) -> None:
+        """
+        Complete the current line, e.g. when the program or connection stops.
+        """
+        self._partial.append(self._decoder.decode(b"", final=True))
+        line = "".join(self._partial)
+        self._partial = []
+        self._partial_length = 0
+        if line:
+            self._append([line])
+
+    def _append(self, lines: list[str]) -> None:
+        overflow = len(self.lines) + len(lines) - self.lines.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.lines.extend(line.rstrip("\r") for line in lines)
+        self._available.set()
+
+    def drain(self, max_lines: int | None = None) -> list[str]:
+        """
+        Remove and return up to `max_lines` buffered lines (all by default).
+        """
+        if max_lines is None or max_lines >= len(self.lines):
+            lines = list(self.lines)
+            self.lines.clear()
+        else:
+            lines = [self.lines.popleft() for _ in range(max_lines)]
+        if not self.lines:
+            self._available.clear()
+        return lines
+
+    async def wait(self) -> None:
+        """
+        Wait until at least one complete line is available.
+        """
+        await self._available.wait()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            await self.wait()
+            for line in self.drain():
+                yield line
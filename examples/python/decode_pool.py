@@ -0,0 +1,277 @@
+"""
+Example of moving frame decoding off the asyncio event loop and onto a pool
+of worker processes, for hosts that ingest notifications from many hubs.
+
+The event loop only copies each raw frame into a shared-memory ring buffer.
+Worker processes run ``cobs.unpack`` and ``messages.deserialize`` on the
+frames and send back compact results made of plain Python values.
+
+Frames from the same hub are always routed to the same worker, and every
+worker processes its ring buffer in order, so results for a single hub are
+produced in the order its frames were received.
+
+Example usage::
+
+    with DecodePool() as pool:
+        pool.submit("hub-a", frame)
+        async for batch in pool.results():
+            for hub, message_id, fields in batch:
+                ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import queue
+import struct
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import AsyncIterator, Hashable
+
+import cobs
+from messages import BaseMessage, deserialize
+
+
+RING_CAPACITY = 1 << 20
+"""Default size of each worker's ring buffer in bytes"""
+
+RESULT_BATCH_SIZE = 64
+"""Maximum number of results a worker sends back in a single batch"""
+
+POLL_INTERVAL = 0.1
+"""How long results() waits for results at a time (in seconds)"""
+
+ERROR_ID = -1
+"""Message ID reported for frames that could not be decoded"""
+
+MAX_HUBS = 0xFFFF
+"""Maximum number of hubs a pool decodes frames for"""
+
+STOP_TIMEOUT = 1.0
+"""How long close() waits for the workers to exit (in seconds)"""
+
+_HEADER_SIZE = 16
+"""Ring buffer header: total bytes written (head) and total bytes read (tail)"""
+
+_RECORD = struct.Struct("<HH")
+"""Record header: hub index and frame length"""
+
+_STOP = MAX_HUBS
+"""Hub index used to tell a worker to exit, never used for a hub"""
+
+
+class SharedRing:
+    """
+    Single-producer, single-consumer ring buffer of frames in shared memory.
+
+    Each record consists of a hub index, the frame length and the frame itself.
+    Records may wrap around the end of the buffer.
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY, name: str | None = None):
+        self.capacity = capacity
+        if name is None:
+            self.shm = SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        else:
+            self.shm = SharedMemory(name=name)
+        # each counter is read and written as a whole, so the other process
+        # never sees a partially updated value
+        self.counters = self.shm.buf[:_HEADER_SIZE].cast("Q")
+        self.data = self.shm.buf[_HEADER_SIZE : _HEADER_SIZE + capacity]
+        if name is None:
+            self.counters[0] = self.counters[1] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def put(self, hub: int, frame: bytes) -> bool:
+        """
+        Append a frame to the buffer.
+        Returns False if there is not enough free space.
+        """
+        head, tail = self.counters
+        needed = _RECORD.size + len(frame)
+        if needed > self.capacity - (head - tail):
+            return False
+        self._write(head, _RECORD.pack(hub, len(frame)))
+        self._write(head + _RECORD.size, frame)
+        # publish the record only once it has been fully written
+        self.counters[0] = head + needed
+        return True
+
+    def get(self) -> tuple[int, bytes] | None:
+        """
+        Remove and return the oldest frame, or None if the buffer is empty.
+        """
+        head, tail = self.counters
+        if head == tail:
+            return None
+        hub, size = _RECORD.unpack(self._read(tail, _RECORD.size))
+        frame = self._read(tail + _RECORD.size, size)
+        self.counters[1] = tail + _RECORD.size + size
+        return hub, frame
+
+    def _write(self, position: int, data: bytes) -> None:
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.data[start : start + first] = data[:first]
+        self.data[: len(data) - first] = data[first:]
+
+    def _read(self, position: int, size: int) -> bytes:
+        start = position % self.capacity
+        first = min(size, self.capacity - start)
+        return bytes(self.data[start : start + first]) + bytes(
+            self.data[: size - first]
+        )
+
+    def close(self, unlink: bool = False) -> None:
+        self.counters.release()
+        self.data.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def compact(message: BaseMessage) -> dict:
+    """
+    Reduce a message to a dictionary of its public fields.
+    """
+    return {k: v for k, v in vars(message).items() if not k.startswith("_")}
+
+
+def decode_frame(frame: bytes) -> tuple[int, dict | str]:
+    """
+    Unpack and deserialize a frame, returning the message ID and its fields.
+    If the frame cannot be decoded, ERROR_ID and the error are returned instead.
+    """
+    try:
+        message = deserialize(cobs.unpack(frame))
+    except (ValueError, IndexError, struct.error) as e:
+        return ERROR_ID, str(e)
+    return message.ID, compact(message)
+
+
+def _worker(ring_name: str, capacity: int, items, results) -> None:
+    """Decode frames from a ring buffer until told to stop."""
+    ring = SharedRing(capacity, ring_name)
+    try:
+        running = True
+        while running:
+            items.acquire()
+            batch = []
+            while True:
+                hub, frame = ring.get()
+                if hub == _STOP:
+                    running = False
+                    break
+                batch.append((hub, *decode_frame(frame)))
+                # keep going while more frames are already waiting
+                if len(batch) >= RESULT_BATCH_SIZE or not items.acquire(False):
+                    break
+            if batch:
+                results.put(batch)
+    finally:
+        ring.close()
+
+
+class DecodePool:
+    """
+    Pool of worker processes decoding frames received from many hubs.
+    """
+
+    def __init__(self, workers: int | None = None, capacity: int = RING_CAPACITY):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.capacity = capacity
+        self.dropped = 0
+        self._rings: list[SharedRing] = []
+        self._items = []
+        self._processes = []
+        self._results = None
+        self._hubs: list[Hashable] = []
+        self._hub_index: dict[Hashable, int] = {}
+
+    def start(self) -> None:
+        self._results = multiprocessing.Queue()
+        for _ in range(self.workers):
+            ring = SharedRing(self.capacity)
+            items = multiprocessing.Semaphore(0)
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(ring.name, self.capacity, items, self._results),
+                daemon=True,
+            )
+            process.start()
+            self._rings.append(ring)
+            self._items.append(items)
+            self._processes.append(process)
+
+    def close(self) -> None:
+        deadline = time.monotonic() + STOP_TIMEOUT
+        try:
+            for ring, items, process in zip(self._rings, self._items, self._processes):
+                while not ring.put(_STOP, b""):
+                    # a worker that died or is stuck never frees up space
+                    if not process.is_alive() or time.monotonic() > deadline:
+                        break
+                    time.sleep(0.01)  # wait for the worker to free up space
+                items.release()
+            for process in self._processes:
+                # a worker blocked on a full result queue cannot exit by itself
+                process.join(timeout=max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+        finally:
+            for ring in self._rings:
+                ring.close(unlink=True)
+        self._rings.clear()
+        self._items.clear()
+        self._processes.clear()
+
+    def __enter__(self) -> DecodePool:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, hub: Hashable, frame: bytes) -> bool:
+        """
+        Queue a raw frame received from a hub for decoding.
+        Returns False (and counts the frame as dropped) if the worker is
+        too far behind to accept it.
+        """
+        index = self._hub_index.get(hub)
+        if index is None:
+            if len(self._hubs) >= MAX_HUBS:
+                raise ValueError(f"Too many hubs: at most {MAX_HUBS} are supported")
+            index = self._hub_index[hub] = len(self._hubs)
+            self._hubs.append(hub)
+        worker = index % self.workers
+        if not self._rings[worker].put(index, frame):
+            self.dropped += 1
+            return False
+        self._items[worker].release()
+        return True
+
+    def get(self, timeout: float | None = None) -> list[tuple[Hashable, int, dict]]:
+        """
+        Wait for the next batch of results as (hub, message ID, fields) tuples.
+        """
+        batch = self._results.get(timeout=timeout)
+        return [(self._hubs[index], id, fields) for index, id, fields in batch]
+
+    async def results(self) -> AsyncIterator[list[tuple[Hashable, int, dict]]]:
+        """
+        Asynchronously iterate over batches of results, until the pool is closed.
+        """
+        loop = asyncio.get_running_loop()
+        while self._processes:
+            # wait in short intervals, so that no executor thread stays blocked
+            # after the consumer stops iterating or the pool is closed
+            try:
+                batch = await loop.run_in_executor(None, self.get, POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            yield batch
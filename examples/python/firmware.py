@@ -0,0 +1,131 @@
+"""
+Example of a resumable firmware upload.
+
+The firmware image is memory-mapped rather than read into memory, and its
+SHA-1 and CRC32 are calculated together in a single pass over the file.
+
+The hub remembers how many bytes of an image (identified by its SHA-1) it has
+already received, and reports this in the StartFirmwareUploadResponse. The
+upload continues from that offset, so an upload interrupted by a lost
+connection does not have to start over. The running CRC for the part that was
+already uploaded is rebuilt locally, without sending that part again.
+
+Example usage::
+
+    with FirmwareImage("firmware.bin") as image:
+        await upload_firmware(send_request, image, info_response.max_chunk_size)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+from binascii import crc32
+from pathlib import Path
+
+from crc import crc
+from messages import (
+    BeginFirmwareUpdateRequest,
+    BeginFirmwareUpdateResponse,
+    StartFirmwareUploadRequest,
+    StartFirmwareUploadResponse,
+)
+from transfer import SendRequest, TransferError, transfer_chunks
+
+
+BLOCK_SIZE = 1 << 16
+"""Number of bytes processed at a time when hashing the image (multiple of 4)"""
+
+
+class FirmwareImage:
+    """
+    Memory-mapped firmware image with its SHA-1 and CRC32.
+    """
+
+    def __init__(self, path: Path | str):
+        with open(path, "rb") as f:
+            if not f.seek(0, 2):
+                raise ValueError(f"Firmware image is empty: {path}")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.data)
+
+        # CRC32 of the data before each block, used when resuming an upload
+        self._checkpoints = []
+        sha = hashlib.sha1()
+        running_crc = 0
+        for i in range(0, self.size, BLOCK_SIZE):
+            self._checkpoints.append(running_crc)
+            block = self.data[i : i + BLOCK_SIZE]
+            sha.update(block)
+            running_crc = crc(block, running_crc)
+
+        self.sha = sha.digest()
+        self.crc = running_crc
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __enter__(self) -> FirmwareImage:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def running_crc(self, offset: int, chunk_size: int) -> int:
+        """
+        Return the running CRC after the first `offset` bytes of the image
+        have been transferred in chunks of `chunk_size` bytes.
+        """
+        if chunk_size % 4:
+            # every chunk is padded, so the CRC must be rebuilt chunk by chunk
+            running_crc = 0
+            for i in range(0, offset, chunk_size):
+                chunk = self.data[i : min(i + chunk_size, offset)]
+                running_crc = crc(chunk, running_crc)
+            return running_crc
+
+        # only the last chunk can be padded, so up to that point the running
+        # CRC is the CRC of the data itself and can continue from a checkpoint
+        block = offset // BLOCK_SIZE
+        if block == len(self._checkpoints):
+            return self.crc
+        aligned = offset - offset % 4
+        start = block * BLOCK_SIZE
+        running_crc = crc32(self.data[start:aligned], self._checkpoints[block])
+        if offset > aligned:
+            running_crc = crc(self.data[aligned:offset], running_crc)
+        return running_crc
+
+
+async def upload_firmware(
+    send_request: SendRequest, image: FirmwareImage, chunk_size: int
+) -> None:
+    """
+    Upload a firmware image, resuming a previous upload of the same image if
+    possible, then ask the hub to begin the firmware update.
+    """
+    start_response = await send_request(
+        StartFirmwareUploadRequest(image.sha, image.crc), StartFirmwareUploadResponse
+    )
+    if not start_response.success:
+        raise TransferError("Start firmware upload was not acknowledged")
+
+    offset = start_response.uploaded
+    if offset > image.size:
+        raise TransferError(f"Hub reported {offset} of {image.size} bytes uploaded")
+    if offset:
+        print(f"Resuming firmware upload at {offset} of {image.size} bytes")
+
+    await transfer_chunks(
+        send_request,
+        image.data,
+        chunk_size,
+        start=offset,
+        running_crc=image.running_crc(offset, chunk_size),
+    )
+
+    begin_response = await send_request(
+        BeginFirmwareUpdateRequest(image.sha, image.crc), BeginFirmwareUpdateResponse
+    )
+    if not begin_response.success:
+        raise TransferError("Begin firmware update was not acknowledged")
@@ -0,0 +1,153 @@
+"""
+Example of a gateway that forwards the state of hubs to many WebSocket
+clients, e.g. browser dashboards.
+
+The gateway subscribes to the device notifications of each hub once, and
+encodes every notification once into a compact JSON frame::
+
+    {"hub":"<address>","devices":[["Battery",[0,100]],["IMU",[1,0,4,...]],...]}
+
+The same frame is then handed to every client, so the cost of an update does
+not depend on the number of clients, apart from the send itself.
+
+Each client has its own sender task, and at most one pending frame per hub.
+Since a notification holds the complete state of a hub, a newer frame simply
+replaces an older one that has not been sent yet. A slow client therefore
+receives fewer updates rather than falling further and further behind, and
+does not hold up the other clients. New clients are first sent the latest
+state of every hub.
+
+The WebSocket server uses the `websockets` package, which is only imported
+when the server is started.
+
+Example usage::
+
+    gateway = TelemetryGateway()
+    gateway.attach(client.address, connection.router)
+    await gateway.serve("localhost", 8765)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Awaitable, Callable, Hashable
+
+from messages import DeviceNotification
+from router import MessageRouter
+
+
+HOST = "localhost"
+PORT = 8765
+
+
+class GatewayClient:
+    """
+    Sends frames to a single client, keeping only the latest frame per key.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable]):
+        self._send = send
+        # dicts keep their insertion order, so a key that is updated
+        # repeatedly keeps its place instead of starving the others
+        self._pending: dict[Hashable, str] = {}
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.conflated = 0
+
+    def offer(self, key: Hashable, frame: str) -> None:
+        """
+        Queue a frame, replacing the pending frame for the same key.
+        """
+        if key in self._pending:
+            self.conflated += 1
+        self._pending[key] = frame
+        self._ready.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def run(self) -> None:
+        """
+        Send frames as fast as the client accepts them, until cancelled.
+        """
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                key = next(iter(self._pending))
+                await self._send(self._pending.pop(key))
+                self.sent += 1
+            self._ready.clear()
+
+
+def encode_state(hub: str, message: DeviceNotification) -> str:
+    """
+    Encode the device messages of a notification as a JSON frame.
+    """
+    state = {"hub": hub, "devices": message.messages}
+    return json.dumps(state, separators=(",", ":"))
+
+
+class TelemetryGateway:
+    """
+    Fans out the state of hubs to any number of clients.
+    """
+
+    def __init__(self):
+        self.clients: set[GatewayClient] = set()
+        # the latest frame of every hub, for new clients
+        self.latest: dict[Hashable, str] = {}
+        self.published = 0
+
+    def add_client(self, send: Callable[[str], Awaitable]) -> GatewayClient:
+        client = GatewayClient(send)
+        for key, frame in self.latest.items():
+            client.offer(key, frame)
+        self.clients.add(client)
+        return client
+
+    def remove_client(self, client: GatewayClient) -> None:
+        self.clients.discard(client)
+
+    def publish(self, key: Hashable, frame: str) -> None:
+        """
+        Send an encoded frame to all clients.
+        """
+        self.latest[key] = frame
+        self.published += 1
+        for client in self.clients:
+            client.offer(key, frame)
+
+    def attach(self, hub: str, router: MessageRouter) -> Callable[[], None]:
+        """
+        Publish the device notifications of a hub.
+        Returns a function that stops publishing them.
+        """
+
+        def on_notification(message: DeviceNotification) -> None:
+            self.publish(hub, encode_state(hub, message))
+
+        return router.subscribe(DeviceNotification, on_notification)
+
+    async def handle(self, websocket) -> None:
+        """
+        Serve a WebSocket connection until it is closed.
+        """
+        client = self.add_client(websocket.send)
+        sender = asyncio.create_task(client.run())
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.remove_client(client)
+            sender.cancel()
+            # sending fails once the connection is closed
+            await asyncio.gather(sender, return_exceptions=True)
+
+    async def serve(self, host: str = HOST, port: int = PORT) -> None:
+        """
+        Accept WebSocket connections until cancelled.
+        """
+        from websockets.asyncio.server import serve
+
+        async with serve(self.handle, host, port) as server:
+            await server.serve_forever()
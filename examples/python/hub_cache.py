@@ -0,0 +1,105 @@
+"""
+Example of a persistent on-disk cache of known hubs.
+
+For every hub that has been connected to before, the cache stores its address,
+name and UUID, along with the limits from the last InfoResponse for each
+firmware version the hub has reported. With this information a client can
+connect to a known hub directly instead of scanning for it, and can start
+communicating with the cached packet and chunk sizes while the handshake is
+being confirmed.
+
+The cache is a plain JSON file and is safe to delete at any time.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from messages import InfoResponse
+from storage import write_atomic
+
+
+CACHE_PATH = Path.home() / ".cache" / "spike-prime" / "hubs.json"
+"""Default location of the cache file"""
+
+
+def firmware_version(info: InfoResponse) -> str:
+    """
+    Format the firmware version of an InfoResponse as a cache key.
+    """
+    return f"{info.firmware_major}.{info.firmware_minor}.{info.firmware_build}"
+
+
+class HubCache:
+    """
+    On-disk cache of known hubs, keyed by address.
+    """
+
+    def __init__(self, path: Path | str = CACHE_PATH):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding="utf8") as f:
+                self.hubs: dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            # missing or corrupt cache, start over
+            self.hubs = {}
+
+    def save(self) -> None:
+        """
+        Write the cache to disk, replacing the previous file atomically.
+        """
+        write_atomic(self.path, json.dumps(self.hubs, indent=2).encode("utf8"))
+
+    def addresses(self) -> list[str]:
+        """
+        Return the addresses of all known hubs, most recently seen first.
+        """
+        return sorted(
+            self.hubs, key=lambda a: self.hubs[a].get("last_seen", 0), reverse=True
+        )
+
+    def get(self, address: str) -> dict | None:
+        return self.hubs.get(address)
+
+    def update(
+        self, address: str, name: str | None = None, uuid: bytes | None = None
+    ) -> None:
+        """
+        Record that a hub has been seen, optionally updating its name and UUID.
+        """
+        hub = self.hubs.setdefault(address, {"info": {}})
+        hub["last_seen"] = time.time()
+        if name is not None:
+            hub["name"] = name
+        if uuid is not None:
+            hub["uuid"] = uuid.hex()
+
+    def uuid(self, address: str) -> bytes | None:
+        hub = self.hubs.get(address)
+        if hub is None or "uuid" not in hub:
+            return None
+        return bytes.fromhex(hub["uuid"])
+
+    def store_info(self, address: str, info: InfoResponse) -> None:
+        """
+        Store the limits reported by a hub for its current firmware version.
+        """
+        hub = self.hubs.setdefault(address, {"info": {}})
+        version = firmware_version(info)
+        hub["info"][version] = vars(info)
+        hub["firmware"] = version
+
+    def info(self, address: str, firmware: str | None = None) -> InfoResponse | None:
+        """
+        Return the cached InfoResponse for a hub.
+        Unless a firmware version is given, the most recently reported one is used.
+        """
+        hub = self.hubs.get(address)
+        if hub is None:
+            return None
+        fields = hub["info"].get(firmware or hub.get("firmware"))
+        if fields is None:
+            return None
+        return InfoResponse(**fields)
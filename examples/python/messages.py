@@ -13,6 +13,8 @@ class BaseMessage(ABC):
 
     @staticmethod
     def deserialize(data: bytes) -> BaseMessage:
+        # data may be a view of a buffer that is reused afterwards,
+        # so messages must copy any part of it they keep
         raise NotImplementedError
 
     def __str__(self) -> str:
@@ -113,6 +115,35 @@ class ClearSlotRequest(BaseMessage):
 ClearSlotResponse = StatusResponse("ClearSlotResponse", 0x47)
 
 
+class StartFirmwareUploadRequest(BaseMessage):
+    ID = 0x0A
+
+    def __init__(self, file_sha: bytes, crc: int):
+        self.file_sha = file_sha
+        self.crc = crc
+
+    def serialize(self):
+        return struct.pack("<B20sI", self.ID, self.file_sha, self.crc)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(file_sha={self.file_sha.hex()}, crc={self.crc})"
+        )
+
+
+class StartFirmwareUploadResponse(BaseMessage):
+    ID = 0x0B
+
+    def __init__(self, success: bool, uploaded: int):
+        self.success = success
+        self.uploaded = uploaded
+
+    @staticmethod
+    def deserialize(data: bytes) -> StartFirmwareUploadResponse:
+        id, status, uploaded = struct.unpack("<BBI", data)
+        return StartFirmwareUploadResponse(status == 0x00, uploaded)
+
+
 class StartFileUploadRequest(BaseMessage):
     ID = 0x0C
 
@@ -150,6 +181,66 @@ class TransferChunkRequest(BaseMessage):
 TransferChunkResponse = StatusResponse("TransferChunkResponse", 0x11)
 
 
+class BeginFirmwareUpdateRequest(BaseMessage):
+    ID = 0x14
+
+    def __init__(self, file_sha: bytes, crc: int):
+        self.file_sha = file_sha
+        self.crc = crc
+
+    def serialize(self):
+        return struct.pack("<B20sI", self.ID, self.file_sha, self.crc)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(file_sha={self.file_sha.hex()}, crc={self.crc})"
+        )
+
+
+BeginFirmwareUpdateResponse = StatusResponse("BeginFirmwareUpdateResponse", 0x15)
+
+
+class GetHubNameRequest(BaseMessage):
+    ID = 0x18
+
+    def serialize(self):
+        return struct.pack("<B", self.ID)
+
+
+class GetHubNameResponse(BaseMessage):
+    ID = 0x19
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @staticmethod
+    def deserialize(data: bytes) -> GetHubNameResponse:
+        name_bytes = bytes(data[1:]).split(b"\0", 1)[0]
+        return GetHubNameResponse(name_bytes.decode("utf8"))
+
+
+class DeviceUuidRequest(BaseMessage):
+    ID = 0x1A
+
+    def serialize(self):
+        return struct.pack("<B", self.ID)
+
+
+class DeviceUuidResponse(BaseMessage):
+    ID = 0x1B
+
+    def __init__(self, uuid: bytes):
+        self.uuid = uuid
+
+    @staticmethod
+    def deserialize(data: bytes) -> DeviceUuidResponse:
+        id, uuid = struct.unpack("<B16s", data)
+        return DeviceUuidResponse(uuid)
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}({self.uuid.hex()})"
+
+
 class ProgramFlowRequest(BaseMessage):
     ID = 0x1E
 
@@ -179,18 +270,47 @@ class ProgramFlowNotification(BaseMessage):
 class ConsoleNotification(BaseMessage):
     ID = 0x21
 
-    def __init__(self, text: str):
-        self.text = text
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    @property
+    def text(self) -> str:
+        # a multi-byte character may be split across notifications,
+        # use console.ConsoleStream to decode a sequence of notifications
+        return self.payload.decode("utf8", errors="replace")
 
     @staticmethod
     def deserialize(data: bytes) -> ConsoleNotification:
-        text_bytes = data[1:].rstrip(b"\0")
-        return ConsoleNotification(text_bytes.decode("utf8"))
+        return ConsoleNotification(bytes(data[1:]).rstrip(b"\0"))
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}({self.text!r})"
 
 
+class TunnelMessage(BaseMessage):
+    ID = 0x32
+
+    def __init__(self, payload: bytes):
+        self.size = len(payload)
+        self.payload = payload
+
+    def serialize(self):
+        fmt = f"<BH{self.size}s"
+        return struct.pack(fmt, self.ID, self.size, self.payload)
+
+    @staticmethod
+    def deserialize(data: bytes) -> TunnelMessage:
+        id, size = struct.unpack_from("<BH", data)
+        if len(data) != size + 3:
+            raise ValueError(
+                f"Unexpected tunnel message size: {len(data)} != {size} + 3"
+            )
+        return TunnelMessage(bytes(data[3:]))
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(size={self.size})"
+
+
 class DeviceNotificationRequest(BaseMessage):
     ID = 0x28
 
@@ -222,25 +342,30 @@ class DeviceNotification(BaseMessage):
         self.size = size
         self._payload = payload
         self.messages = []
-        data = payload[:]
-        while data:
-            id = data[0]
+        offset = 0
+        while offset < len(payload):
+            id = payload[offset]
             if id in DEVICE_MESSAGE_MAP:
                 name, fmt = DEVICE_MESSAGE_MAP[id]
-                size = struct.calcsize(fmt)
-                values = struct.unpack(fmt, data[:size])
+                values = struct.unpack_from(fmt, payload, offset)
                 self.messages.append((name, values))
-                data = data[size:]
+                offset += struct.calcsize(fmt)
             else:
                 print(f"Unknown message: {id}")
                 break
 
+    @property
+    def payload(self) -> bytes:
+        # the device messages as received,
+        # use telemetry.HubTelemetry to record them without decoding each one
+        return self._payload
+
     @staticmethod
     def deserialize(data: bytes) -> DeviceNotification:
-        id, size = struct.unpack("<BH", data[:3])
+        id, size = struct.unpack_from("<BH", data)
         if len(data) != size + 3:
             print(f"Unexpected size: {len(data)} != {size} + 3")
-        return DeviceNotification(size, data[3:])
+        return DeviceNotification(size, bytes(data[3:]))
 
     def __str__(self) -> str:
         updated = list(map(lambda x: x[0], self.messages))
@@ -254,14 +379,23 @@ KNOWN_MESSAGES = {
         InfoResponse,
         ClearSlotRequest,
         ClearSlotResponse,
+        StartFirmwareUploadRequest,
+        StartFirmwareUploadResponse,
         StartFileUploadRequest,
         StartFileUploadResponse,
         TransferChunkRequest,
         TransferChunkResponse,
+        BeginFirmwareUpdateRequest,
+        BeginFirmwareUpdateResponse,
+        GetHubNameRequest,
+        GetHubNameResponse,
+        DeviceUuidRequest,
+        DeviceUuidResponse,
         ProgramFlowRequest,
         ProgramFlowResponse,
         ProgramFlowNotification,
         ConsoleNotification,
+        TunnelMessage,
         DeviceNotificationRequest,
         DeviceNotificationResponse,
         DeviceNotification,
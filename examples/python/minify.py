@@ -0,0 +1,131 @@
+"""
+Example of reducing the size of a program before uploading it to the hub.
+
+Upload time is proportional to the number of bytes sent, and the hub has no
+use for comments, docstrings, blank lines or deep indentation. The program is
+parsed and written back out from its syntax tree without docstrings, which
+also drops comments and redundant whitespace. It is then reindented with a
+single space per level and without blank lines. The result is equivalent to
+the original program.
+
+Since the same programs are often uploaded many times, results are cached on
+disk by a hash of the original source.
+
+Example usage::
+
+    result = minify_cached(program)
+    print(result.report())
+    upload(result.data)
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import io
+import tokenize
+from pathlib import Path
+
+from storage import write_atomic
+
+
+CACHE_DIR = Path.home() / ".cache" / "spike-prime" / "minify"
+"""Default location of the cache of minified programs"""
+
+MINIFY_VERSION = b"1"
+"""Included in cache keys, change when the output of minify() changes"""
+
+_INDENT = " " * 4
+"""Indentation used by ast.unparse"""
+
+
+class MinifyResult:
+    """
+    A minified program along with its size before and after minifying.
+    """
+
+    def __init__(self, data: bytes, original_size: int, cached: bool = False):
+        self.data = data
+        self.original_size = original_size
+        self.cached = cached
+
+    @property
+    def savings(self) -> int:
+        return self.original_size - len(self.data)
+
+    def report(self) -> str:
+        percent = 100 * self.savings / self.original_size if self.original_size else 0
+        cached = " (cached)" if self.cached else ""
+        return (
+            f"Minified {self.original_size} -> {len(self.data)} bytes, "
+            f"saved {self.savings} bytes ({percent:.0f}%){cached}"
+        )
+
+
+class _StripStrings(ast.NodeTransformer):
+    """Remove docstrings and other statements consisting only of a string."""
+
+    _BLOCKS = ("body", "orelse", "finalbody")
+
+    def visit_Expr(self, node: ast.Expr) -> ast.Expr | None:
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            return None
+        return node
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        blocks = [getattr(node, f, None) for f in self._BLOCKS]
+        blocks = [(block, len(block)) for block in blocks if isinstance(block, list)]
+        super().generic_visit(node)
+        # a block that has become empty must still contain a statement
+        for block, size in blocks:
+            if size and not block and not isinstance(node, ast.Module):
+                block.append(ast.Pass())
+        return node
+
+
+def _reindent(source: str) -> str:
+    """Remove blank lines and replace each level of indentation with one space."""
+    # lines inside multi-line strings must be left untouched
+    in_string = set()
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type == tokenize.STRING and token.end[0] > token.start[0]:
+            in_string.update(range(token.start[0] + 1, token.end[0] + 1))
+
+    lines = []
+    for number, line in enumerate(source.splitlines(), start=1):
+        if number not in in_string:
+            stripped = line.lstrip(" ")
+            if not stripped:
+                continue
+            depth = (len(line) - len(stripped)) // len(_INDENT)
+            line = " " * depth + stripped
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def minify(source: bytes) -> bytes:
+    """
+    Return a smaller, equivalent version of a utf8-encoded program,
+    or the program itself if it cannot be made any smaller.
+    """
+    tree = ast.parse(source)
+    tree = _StripStrings().visit(tree)
+    minified = _reindent(ast.unparse(tree)).encode("utf8")
+    # rewriting can occasionally make a program that is already compact longer
+    return minified if len(minified) < len(source) else source
+
+
+def minify_cached(source: bytes, cache_dir: Path | str = CACHE_DIR) -> MinifyResult:
+    """
+    Minify a program, reusing the result of an earlier call for the same source.
+    """
+    key = hashlib.sha256(MINIFY_VERSION + b"\0" + source).hexdigest()
+    path = Path(cache_dir) / f"{key}.py"
+    try:
+        return MinifyResult(path.read_bytes(), len(source), cached=True)
+    except OSError:
+        pass
+
+    data = minify(source)
+    write_atomic(path, data)
+    return MinifyResult(data, len(source))
@@ -0,0 +1,237 @@
+"""
+Example of adapting the device notification interval of many hubs to the load
+on the host and the radio.
+
+Each hub has an IntervalController, which is fed with measurements of how
+the host is keeping up with that hub:
+
+    * the number of notifications waiting to be processed (queue depth)
+    * the time taken to decode and handle a notification
+    * the round-trip time of requests to the hub
+
+When any of these indicate that the host or the link is falling behind, the
+interval is doubled. Otherwise it is gradually shortened again, down to the
+configured minimum. A NotificationRateManager then scales the intervals of all
+hubs so that the total number of notifications per second stays within a
+global budget, and re-issues DeviceNotificationRequest to hubs whose interval
+has changed significantly.
+
+Example usage::
+
+    manager = NotificationRateManager(max_per_second=200)
+    controller = manager.add_hub(address, send_request)
+    asyncio.create_task(manager.run())
+
+    # in the notification handler
+    controller.observe_decode_time(elapsed)
+    controller.observe_queue_depth(queue.qsize())
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from typing import Hashable
+
+from messages import DeviceNotificationRequest, DeviceNotificationResponse
+from transfer import SendRequest
+
+
+MIN_INTERVAL_MS = 20
+"""Default shortest interval between device notifications"""
+
+MAX_INTERVAL_MS = 5000
+"""Default longest interval between device notifications"""
+
+MAX_QUEUE_DEPTH = 10
+"""Number of unprocessed notifications above which a hub is slowed down"""
+
+DECODE_BUDGET = 0.5
+"""Largest fraction of the interval that handling a notification may take"""
+
+SPEED_UP = 0.9
+"""Factor the interval is multiplied by while the host is keeping up"""
+
+SMOOTHING = 0.2
+"""Weight of new measurements in the moving averages"""
+
+RETUNE_THRESHOLD = 0.2
+"""Relative change in interval required before the hub is updated"""
+
+
+class IntervalController:
+    """
+    Chooses the notification interval for a single hub from load measurements.
+    """
+
+    def __init__(
+        self,
+        min_interval_ms: int = MIN_INTERVAL_MS,
+        max_interval_ms: int = MAX_INTERVAL_MS,
+        initial_interval_ms: int = MAX_INTERVAL_MS,
+        max_queue_depth: int = MAX_QUEUE_DEPTH,
+    ):
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.max_queue_depth = max_queue_depth
+        self.interval_ms = float(initial_interval_ms)
+        self.queue_depth = 0
+        self.decode_time = 0.0
+        self.rtt = 0.0
+
+    def observe_queue_depth(self, depth: int) -> None:
+        self.queue_depth = depth
+
+    def observe_decode_time(self, seconds: float) -> None:
+        self.decode_time += SMOOTHING * (seconds - self.decode_time)
+
+    def observe_rtt(self, seconds: float) -> None:
+        self.rtt += SMOOTHING * (seconds - self.rtt)
+
+    def overloaded(self) -> bool:
+        """
+        Return True if the host or the link is not keeping up with the hub.
+        """
+        interval = self.interval_ms / 1000
+        return (
+            self.queue_depth > self.max_queue_depth
+            or self.decode_time > interval * DECODE_BUDGET
+            or self.rtt > interval
+        )
+
+    def update(self) -> float:
+        """
+        Adjust and return the desired interval in milliseconds.
+        Backs off quickly when overloaded, and speeds up slowly otherwise.
+        """
+        if self.overloaded():
+            self.interval_ms *= 2
+        else:
+            self.interval_ms *= SPEED_UP
+        self.interval_ms = min(
+            max(self.interval_ms, self.min_interval_ms), self.max_interval_ms
+        )
+        return self.interval_ms
+
+
+def allocate(
+    wanted: dict[Hashable, float],
+    max_per_second: float,
+    max_intervals: dict[Hashable, float] | None = None,
+) -> dict:
+    """
+    Scale the wanted intervals (in milliseconds) of all hubs evenly, so the
+    total number of notifications per second stays within the budget.
+
+    Intervals are capped at `max_intervals`, and the budget left over by hubs
+    at their cap is shared by the others. The total only exceeds the budget if
+    it cannot be met even with every hub at its longest interval.
+    """
+    max_intervals = max_intervals or {}
+    allocated = {}
+    uncapped = dict(wanted)
+    budget = max_per_second
+    while uncapped:
+        total = sum(1000 / interval for interval in uncapped.values())
+        scale = max(total / budget, 1.0) if budget > 0 else math.inf
+        capped = [
+            hub
+            for hub, interval in uncapped.items()
+            if interval * scale > max_intervals.get(hub, math.inf)
+        ]
+        if not capped:
+            for hub, interval in uncapped.items():
+                allocated[hub] = interval * scale
+            break
+        for hub in capped:
+            allocated[hub] = max_intervals[hub]
+            budget -= 1000 / max_intervals[hub]
+            del uncapped[hub]
+    return {hub: allocated[hub] for hub in wanted}
+
+
+class NotificationRateManager:
+    """
+    Keeps the notification intervals of many hubs within a global budget.
+    """
+
+    def __init__(self, max_per_second: float, period: float = 1.0):
+        self.max_per_second = max_per_second
+        self.period = period
+        self.controllers: dict[Hashable, IntervalController] = {}
+        self.intervals: dict[Hashable, int] = {}
+        # True if the hubs cannot be slowed down enough to meet the budget
+        self.over_budget = False
+        self._send_request: dict[Hashable, SendRequest] = {}
+
+    def add_hub(
+        self, hub: Hashable, send_request: SendRequest, **kwargs
+    ) -> IntervalController:
+        """
+        Start managing the notification interval of a hub.
+        Keyword arguments are passed on to its IntervalController.
+        """
+        controller = IntervalController(**kwargs)
+        self.controllers[hub] = controller
+        self._send_request[hub] = send_request
+        return controller
+
+    def remove_hub(self, hub: Hashable) -> None:
+        self.controllers.pop(hub, None)
+        self.intervals.pop(hub, None)
+        self._send_request.pop(hub, None)
+
+    async def retune(self) -> None:
+        """
+        Update the intervals of all hubs, and send the new interval to the
+        hubs where it has changed significantly.
+        """
+        wanted = {hub: c.update() for hub, c in self.controllers.items()}
+        longest = {hub: c.max_interval_ms for hub, c in self.controllers.items()}
+        allocated = allocate(wanted, self.max_per_second, longest)
+        total = sum(1000 / interval for interval in allocated.values())
+        self.over_budget = total > self.max_per_second * (1 + 1e-9)
+        if self.over_budget:
+            print(
+                f"Warning: {total:.1f} notifications per second exceed the "
+                f"budget of {self.max_per_second} at the longest intervals"
+            )
+
+        hubs = []
+        updates = []
+        for hub, interval in allocated.items():
+            interval = round(interval)
+            current = self.intervals.get(hub)
+            if current is None or abs(interval / current - 1) > RETUNE_THRESHOLD:
+                hubs.append(hub)
+                updates.append(self._set_interval(hub, interval))
+        # a hub that fails (e.g. because it disconnected) must not stop the
+        # others from being updated, it is retried on the next retune
+        results = await asyncio.gather(*updates, return_exceptions=True)
+        for hub, result in zip(hubs, results):
+            if isinstance(result, Exception):
+                print(f"Error: failed to set notification interval of {hub}: {result}")
+
+    async def _set_interval(self, hub: Hashable, interval_ms: int) -> None:
+        start = time.perf_counter()
+        response = await self._send_request[hub](
+            DeviceNotificationRequest(interval_ms), DeviceNotificationResponse
+        )
+        if hub not in self.controllers:
+            return  # removed while waiting for the response
+        self.controllers[hub].observe_rtt(time.perf_counter() - start)
+        if response.success:
+            self.intervals[hub] = interval_ms
+            # judge the load at the interval the hub actually uses, which is
+            # longer than the wanted one if it was stretched to meet the budget
+            controller = self.controllers[hub]
+            controller.interval_ms = max(controller.interval_ms, interval_ms)
+
+    async def run(self) -> None:
+        """
+        Retune the intervals periodically until cancelled.
+        """
+        while True:
+            await self.retune()
+            await asyncio.sleep(self.period)
@@ -0,0 +1,202 @@
+"""
+Example of dispatching received messages to subscribers by message type.
+
+Consumers subscribe to the messages they need, either by message type or by
+type of device message within DeviceNotification (optionally for a single
+port), and the router keeps a table from message ID to the functions that
+handle it. The table is rebuilt whenever the subscriptions change, so
+dispatching a frame is a single lookup.
+
+Only the first byte of each frame is decoded to find its message ID. Frames
+that nobody has subscribed to are dropped without decoding them any further,
+and only the device messages that have subscribers are unpacked from a
+DeviceNotification. Frames are decoded into buffers borrowed from a
+BufferPool, so device messages are unpacked without allocating a copy of the
+frame, and decoded messages only copy the parts of it they keep (e.g. the text
+of a ConsoleNotification).
+
+Example usage::
+
+    router = MessageRouter()
+    router.subscribe(ConsoleNotification, lambda m: print(m.text))
+    router.subscribe_device(MOTOR, on_motor_a, port=PORT_A)
+
+    # for every frame received from the hub
+    router.on_frame(frame)
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Callable
+
+import cobs
+from buffer_pool import DEFAULT_POOL, BufferPool
+from messages import (
+    DEVICE_MESSAGE_MAP,
+    BaseMessage,
+    DeviceNotification,
+    deserialize,
+)
+
+
+MessageHandler = Callable[[BaseMessage], Any]
+DeviceHandler = Callable[[tuple], Any]
+
+BATTERY = 0x00
+IMU = 0x01
+DISPLAY_5X5 = 0x02
+MOTOR = 0x0A
+FORCE_SENSOR = 0x0B
+COLOR_SENSOR = 0x0C
+DISTANCE_SENSOR = 0x0D
+DISPLAY_3X3 = 0x0E
+
+PORT_A, PORT_B, PORT_C, PORT_D, PORT_E, PORT_F = range(6)
+
+PORT_DEVICES = {MOTOR, FORCE_SENSOR, COLOR_SENSOR, DISTANCE_SENSOR, DISPLAY_3X3}
+"""Device messages whose first field is the port of the device"""
+
+DEVICE_STRUCTS = {id: struct.Struct(fmt) for id, (_, fmt) in DEVICE_MESSAGE_MAP.items()}
+
+_NOTIFICATION_HEADER_SIZE = 3
+"""Size of the DeviceNotification ID and payload size fields"""
+
+
+class MessageRouter:
+    """
+    Dispatches frames to the handlers subscribed to their message ID.
+    """
+
+    def __init__(self, pool: BufferPool = DEFAULT_POOL):
+        self.pool = pool
+        self._handlers: dict[int, list[MessageHandler]] = {}
+        self._all_handlers: list[MessageHandler] = []
+        # handlers by device message ID and port (None for all ports)
+        self._device_handlers: dict[tuple, list[DeviceHandler]] = {}
+        # dispatch functions for the decoded data of each message ID
+        self._table: list[tuple | None] = [None] * 256
+        # handlers by port for each device message ID
+        self._device_table: list[dict | None] = [None] * 256
+        self.dispatched = 0
+        self.dropped = 0
+
+    def subscribe(
+        self, message: type[BaseMessage] | int, handler: MessageHandler
+    ) -> Callable[[], None]:
+        """
+        Call `handler` with every message of a type, given as a message class
+        or ID. Returns a function that cancels the subscription.
+        """
+        id = message if isinstance(message, int) else message.ID
+        return self._add(self._handlers.setdefault(id, []), handler)
+
+    def subscribe_all(self, handler: MessageHandler) -> Callable[[], None]:
+        """
+        Call `handler` with every message received.
+        This requires every frame to be decoded, so use it sparingly.
+        """
+        return self._add(self._all_handlers, handler)
+
+    def subscribe_device(
+        self, device: int, handler: DeviceHandler, port: int | None = None
+    ) -> Callable[[], None]:
+        """
+        Call `handler` with the values of every device message of a type in
+        device notifications, optionally only for the device on `port`.
+        """
+        if device not in DEVICE_MESSAGE_MAP:
+            raise ValueError(f"Unknown device message: {device}")
+        if port is not None and device not in PORT_DEVICES:
+            raise ValueError(f"Device message {device} has no port")
+        handlers = self._device_handlers.setdefault((device, port), [])
+        return self._add(handlers, handler)
+
+    def _add(self, handlers: list, handler: Callable) -> Callable[[], None]:
+        handlers.append(handler)
+        self._rebuild()
+
+        def unsubscribe() -> None:
+            if handler in handlers:
+                handlers.remove(handler)
+                self._rebuild()
+
+        return unsubscribe
+
+    def _rebuild(self) -> None:
+        """Precompute the dispatch table from the subscriptions."""
+        table: list[tuple | None] = [None] * 256
+        for id in range(256):
+            handlers = tuple(self._handlers.get(id, ())) + tuple(self._all_handlers)
+            if handlers:
+                table[id] = (_message_dispatcher(handlers),)
+
+        device_table: list[dict | None] = [None] * 256
+        for (device, port), handlers in self._device_handlers.items():
+            if handlers:
+                ports = device_table[device] = device_table[device] or {}
+                ports[port] = ports.get(port, ()) + tuple(handlers)
+        for ports in device_table:
+            # handlers for all ports also receive messages from specific ports
+            if ports and None in ports:
+                for port in ports.keys() - {None}:
+                    ports[port] += ports[None]
+        if any(device_table):
+            id = DeviceNotification.ID
+            table[id] = (table[id] or ()) + (self._dispatch_devices,)
+
+        self._table = table
+        self._device_table = device_table
+
+    def subscribed(self, id: int) -> bool:
+        return self._table[id] is not None
+
+    def on_frame(self, frame: bytes) -> bool:
+        """
+        Dispatch a frame to its subscribers.
+        Returns False if the frame was dropped because nobody subscribed to it.
+        """
+        dispatchers = self._table[cobs.peek(frame)]
+        if dispatchers is None:
+            self.dropped += 1
+            return False
+        buffer = self.pool.acquire(len(frame))
+        try:
+            data = memoryview(buffer)[: cobs.unpack_into(frame, buffer)]
+            self.dispatched += 1
+            for dispatch in dispatchers:
+                dispatch(data)
+        finally:
+            self.pool.release(buffer)
+        return True
+
+    def _dispatch_devices(self, data: memoryview) -> None:
+        """Unpack only the device messages that have subscribers."""
+        device_table = self._device_table
+        offset = _NOTIFICATION_HEADER_SIZE
+        while offset < len(data):
+            device = data[offset]
+            record = DEVICE_STRUCTS.get(device)
+            if record is None:
+                raise ValueError(f"Unknown device message: {device}")
+            ports = device_table[device]
+            if ports is not None:
+                port = data[offset + 1] if device in PORT_DEVICES else None
+                handlers = ports.get(port, ports.get(None))
+                if handlers:
+                    values = record.unpack_from(data, offset)
+                    for handler in handlers:
+                        handler(values)
+            offset += record.size
+
+
+def _message_dispatcher(handlers: tuple) -> Callable[[memoryview], None]:
+    """Return a function that deserializes a message once for all handlers."""
+
+    def dispatch(data: memoryview) -> None:
+        # messages copy only the parts of the data they keep
+        message = deserialize(data)
+        for handler in handlers:
+            handler(message)
+
+    return dispatch
@@ -0,0 +1,132 @@
+"""
+Example of streaming discovery of SPIKE™ Prime hubs.
+
+Rather than waiting for a single match or for the full scan timeout, hubs are
+yielded as soon as their advertisements arrive, so connecting to a hub can
+begin while scanning continues. Each hub is only yielded once, and hubs
+discovered at nearly the same time are yielded strongest signal (RSSI) first.
+
+Example usage::
+
+    async for device, adv in discover(timeout=10.0):
+        print(f"Found {device.name} ({adv.rssi} dBm)")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
+
+SERVICE = "0000fd02-0000-1000-8000-00805f9b34fb"
+"""The SPIKE™ Prime BLE service UUID"""
+
+RANK_WINDOW = 0.2
+"""How long to collect advertisements before ranking them by RSSI (in seconds)"""
+
+
+def match_service_uuid(device: BLEDevice, adv: AdvertisementData) -> bool:
+    return SERVICE.lower() in adv.service_uuids
+
+
+class Discovery:
+    """
+    Collects advertisements from a scanner and yields new hubs in ranked batches.
+    """
+
+    def __init__(self, window: float = RANK_WINDOW):
+        self.window = window
+        self.seen: set[str] = set()
+        self._found: asyncio.Queue = asyncio.Queue()
+
+    def on_advertisement(self, device: BLEDevice, adv: AdvertisementData) -> None:
+        """
+        Scanner callback, called for every advertisement received.
+        """
+        if device.address in self.seen or not match_service_uuid(device, adv):
+            return
+        self.seen.add(device.address)
+        self._found.put_nowait((device, adv))
+
+    async def hubs(
+        self, timeout: float, limit: int | None = None
+    ) -> AsyncIterator[tuple[BLEDevice, AdvertisementData]]:
+        """
+        Yield hubs as they are discovered, until the timeout expires
+        or `limit` hubs have been found.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        count = 0
+        while limit is None or count < limit:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                first = await asyncio.wait_for(self._found.get(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+            # wait briefly for other hubs advertising at the same time
+            await asyncio.sleep(min(self.window, max(deadline - loop.time(), 0)))
+            batch = [first]
+            while not self._found.empty():
+                batch.append(self._found.get_nowait())
+            batch.sort(key=lambda found: found[1].rssi, reverse=True)
+
+            for found in batch[: None if limit is None else limit - count]:
+                count += 1
+                yield found
+
+
+async def discover(
+    timeout: float, limit: int | None = None
+) -> AsyncIterator[tuple[BLEDevice, AdvertisementData]]:
+    """
+    Scan for hubs, yielding each one as soon as it is discovered.
+    Scanning continues in the background while the caller handles a hub.
+    """
+    from bleak import BleakScanner
+
+    discovery = Discovery()
+    async with BleakScanner(
+        detection_callback=discovery.on_advertisement, service_uuids=[SERVICE]
+    ):
+        async for found in discovery.hubs(timeout, limit):
+            yield found
+
+
+async def find_hub(timeout: float) -> BLEDevice | None:
+    """
+    Return the hub with the strongest signal among the first ones discovered.
+    """
+    # close the generator right away, so that scanning has stopped before
+    # the caller connects to the hub
+    async with contextlib.aclosing(discover(timeout, limit=1)) as hubs:
+        async for device, _ in hubs:
+            return device
+    return None
+
+
+async def for_each_hub(
+    handler: Callable[[BLEDevice], Awaitable],
+    timeout: float,
+    limit: int | None = None,
+) -> list:
+    """
+    Run `handler` concurrently for every hub discovered, starting each one as
+    soon as the hub is found. Returns the results (or exceptions) of all handlers.
+
+    When the number of hubs is known in advance, pass it as `limit` to stop
+    scanning as soon as all of them have been found.
+    """
+    tasks = []
+    async with contextlib.aclosing(discover(timeout, limit)) as hubs:
+        async for device, _ in hubs:
+            tasks.append(asyncio.create_task(handler(device)))
+    return await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,134 @@
+"""
+Example of a per-connection send scheduler with priority classes.
+
+Frames are queued by priority and written one whole frame at a time, so a
+higher priority frame only ever waits for the frame currently being written.
+This lets e.g. a ProgramFlowRequest to stop a program reach the hub in
+bounded time, even during a long file upload.
+
+    * CONTROL frames are always sent first.
+    * INTERACTIVE and BULK frames share the remaining capacity, with BULK
+      frames guaranteed one in every `interactive_per_bulk + 1` frames
+      while both are waiting, so neither class is starved.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable
+
+from messages import BaseMessage, ProgramFlowRequest, TransferChunkRequest
+
+
+CONTROL = 0
+"""Priority class for commands that must reach the hub as soon as possible"""
+
+INTERACTIVE = 1
+"""Priority class for regular requests"""
+
+BULK = 2
+"""Priority class for large transfers, such as file uploads"""
+
+MESSAGE_PRIORITY = {
+    ProgramFlowRequest.ID: CONTROL,
+    TransferChunkRequest.ID: BULK,
+}
+"""Priority class of each message type, INTERACTIVE if not listed"""
+
+
+def priority(message: BaseMessage) -> int:
+    """
+    Return the priority class to send a message with.
+    """
+    return MESSAGE_PRIORITY.get(message.ID, INTERACTIVE)
+
+
+class SendScheduler:
+    """
+    Queues frames by priority and writes them one at a time using `write_frame`.
+    """
+
+    def __init__(
+        self,
+        write_frame: Callable[[bytes], Awaitable[None]],
+        interactive_per_bulk: int = 3,
+    ):
+        self.write_frame = write_frame
+        self.interactive_per_bulk = interactive_per_bulk
+        self.queues: tuple[deque, ...] = (deque(), deque(), deque())
+        self._since_bulk = 0
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop sending, failing any frames that have not been written yet.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in self.queues:
+            while queue:
+                _, future = queue.popleft()
+                if not future.done():
+                    future.set_exception(ConnectionError("Scheduler closed"))
+
+    def pending(self) -> bool:
+        """
+        Return True if any frames are waiting to be written.
+        """
+        return any(self.queues)
+
+    async def send(self, frame: bytes, priority: int = INTERACTIVE) -> None:
+        """
+        Queue a frame and wait until it has been written.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queues[priority].append((frame, future))
+        self._ready.set()
+        await future
+
+    def _next(self) -> tuple[bytes, asyncio.Future] | None:
+        """Pick the next frame to write."""
+        control, interactive, bulk = self.queues
+        if control:
+            return control.popleft()
+        if bulk and (not interactive or self._since_bulk >= self.interactive_per_bulk):
+            self._since_bulk = 0
+            return bulk.popleft()
+        if interactive:
+            self._since_bulk += 1
+            return interactive.popleft()
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            next_frame = self._next()
+            if next_frame is None:
+                self._ready.clear()
+                continue
+            frame, future = next_frame
+            if future.done():
+                continue  # sender gave up waiting
+            try:
+                await self.write_frame(frame)
+            except asyncio.CancelledError:
+                # closed while writing, the sender must not wait forever
+                if not future.done():
+                    future.set_exception(ConnectionError("Scheduler closed"))
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,154 @@
+"""
+Example of synchronizing a directory of programs to the slots of a hub.
+
+A local manifest records what was last uploaded successfully to each slot of
+each hub (identified by its UUID): the name of the local file, its CRC and its
+size. Only slots whose content has changed since are cleared and uploaded, so
+pushing the same programs again is a no-op.
+
+Programs are assigned to slots by their file name, which must start with the
+slot number, e.g. ``0_drive.py`` or ``12-line_follower.py``.
+
+Note that the manifest only knows about uploads made through it; if a slot is
+changed by other means, remove the manifest (or the hub's entry in it) to
+force a full upload.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Callable
+
+from crc import crc
+from messages import (
+    ClearSlotRequest,
+    ClearSlotResponse,
+    StartFileUploadRequest,
+    StartFileUploadResponse,
+)
+from storage import write_atomic
+from transfer import SendRequest, TransferError, transfer_chunks
+
+
+MANIFEST_PATH = Path.home() / ".cache" / "spike-prime" / "slots.json"
+"""Default location of the manifest file"""
+
+SLOT_COUNT = 20
+"""Number of program slots on the hub"""
+
+PROGRAM_FILE_NAME = "program.py"
+"""Name of the file as stored on the hub"""
+
+_SLOT_PATTERN = re.compile(r"^(\d+)[_\-.]")
+
+
+class SlotManifest:
+    """
+    On-disk record of the programs last uploaded to each slot of each hub.
+    """
+
+    def __init__(self, path: Path | str = MANIFEST_PATH):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding="utf8") as f:
+                self.hubs: dict[str, dict[str, dict]] = json.load(f)
+        except (OSError, ValueError):
+            self.hubs = {}
+
+    def save(self) -> None:
+        """
+        Write the manifest to disk, replacing the previous file atomically.
+        """
+        write_atomic(self.path, json.dumps(self.hubs, indent=2).encode("utf8"))
+
+    def get(self, uuid: bytes, slot: int) -> dict | None:
+        return self.hubs.get(uuid.hex(), {}).get(str(slot))
+
+    def is_current(self, uuid: bytes, slot: int, file: str, data: bytes) -> bool:
+        """
+        Return True if `data` is what was last uploaded to the slot.
+        """
+        return self.get(uuid, slot) == _entry(file, data)
+
+    def record(self, uuid: bytes, slot: int, file: str, data: bytes) -> None:
+        self.hubs.setdefault(uuid.hex(), {})[str(slot)] = _entry(file, data)
+
+    def forget(self, uuid: bytes, slot: int) -> None:
+        self.hubs.get(uuid.hex(), {}).pop(str(slot), None)
+
+
+def _entry(file: str, data: bytes) -> dict:
+    return {"file": file, "crc": crc(data), "size": len(data)}
+
+
+def programs_in(directory: Path | str) -> dict[int, Path]:
+    """
+    Find the programs in a directory, keyed by the slot they belong in.
+    """
+    programs = {}
+    for path in sorted(Path(directory).glob("*.py")):
+        match = _SLOT_PATTERN.match(path.name)
+        if match is None or int(match[1]) >= SLOT_COUNT:
+            continue
+        slot = int(match[1])
+        if slot in programs:
+            raise ValueError(
+                f"Multiple programs for slot {slot}: {programs[slot].name}, {path.name}"
+            )
+        programs[slot] = path
+    return dict(sorted(programs.items()))
+
+
+async def upload_program(
+    send_request: SendRequest, slot: int, data: bytes, chunk_size: int
+) -> None:
+    """
+    Clear a slot and upload a program to it.
+    """
+    # the slot may already be empty, in which case the request is not acknowledged
+    await send_request(ClearSlotRequest(slot), ClearSlotResponse)
+
+    start_upload_response = await send_request(
+        StartFileUploadRequest(PROGRAM_FILE_NAME, slot, crc(data)),
+        StartFileUploadResponse,
+    )
+    if not start_upload_response.success:
+        raise TransferError(f"Start file upload to slot {slot} was not acknowledged")
+    await transfer_chunks(send_request, data, chunk_size)
+
+
+async def sync(
+    send_request: SendRequest,
+    directory: Path | str,
+    uuid: bytes,
+    chunk_size: int,
+    manifest: SlotManifest,
+    transform: Callable[[bytes], bytes] | None = None,
+) -> list[int]:
+    """
+    Upload the programs in `directory` whose content differs from what is
+    recorded in the manifest for the hub. Returns the slots that were uploaded.
+
+    If given, `transform` is applied to each program before it is compared
+    and uploaded, e.g. to minify it.
+    """
+    uploaded = []
+    for slot, path in programs_in(directory).items():
+        data = path.read_bytes()
+        if transform is not None:
+            data = transform(data)
+        if manifest.is_current(uuid, slot, path.name, data):
+            continue
+
+        # the slot no longer holds what was recorded, even if the upload fails
+        manifest.forget(uuid, slot)
+        manifest.save()
+
+        print(f"Uploading {path.name} to slot {slot}")
+        await upload_program(send_request, slot, data, chunk_size)
+        manifest.record(uuid, slot, path.name, data)
+        manifest.save()
+        uploaded.append(slot)
+    return uploaded
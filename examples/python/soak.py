@@ -0,0 +1,322 @@
+"""
+Soak test of the protocol stack against a simulated hub, to find slow leaks
+and performance degradation that only show up in long-running processes.
+
+A HubConnection is connected to a SimulatedHub in the same process, without
+BLE. The hub streams device notifications and console output, and answers
+requests, occasionally losing a response. The test drives a realistic mix of
+traffic through it: notifications, console lines, requests with a timeout,
+and program uploads.
+
+While running, it periodically samples
+
+    * memory allocated by Python (tracemalloc)
+    * resident set size of the process (where available)
+    * number of objects tracked by the garbage collector
+    * number of requests waiting for a response
+    * p50 and p99 round-trip time of requests
+
+and fails if any of them grows by more than the configured limits between
+the first sample (taken after a warm-up period) and the last one.
+
+Run from the command line, e.g. for a million frames::
+
+    python soak.py --frames 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import struct
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import cobs
+from buffer_pool import BufferPool
+from connection import HubConnection
+from messages import (
+    DEVICE_MESSAGE_MAP,
+    DeviceNotification,
+    DeviceNotificationRequest,
+    DeviceNotificationResponse,
+    InfoResponse,
+)
+from router import IMU, MOTOR
+from slot_sync import upload_program
+from transfer import TransferError
+
+
+INFO = InfoResponse(1, 0, 0, 1, 0, 0, 509, 8192, 476, 0)
+"""Limits reported by the simulated hub"""
+
+PROGRAM = b"import runloop\n" + b"print('soak')\n" * 200
+"""Program uploaded during the test"""
+
+REQUEST_TIMEOUT = 0.05
+"""How long to wait for a response before giving up on a request (in seconds)"""
+
+WARMUP = 0.1
+"""Fraction of the frames sent before the first sample is taken"""
+
+
+class SimulatedHub:
+    """
+    Answers requests and streams notifications like a hub, in the same process.
+    """
+
+    def __init__(
+        self,
+        info: InfoResponse = INFO,
+        loss_every: int = 100,
+    ):
+        self.info = info
+        # every loss_every-th response is lost, 0 for none
+        self.loss_every = loss_every
+        self.deliver: Callable[[bytes], None] | None = None
+        self.frames_received = 0
+        self.frames_sent = 0
+        self._requests = 0
+        self._buffer = bytearray()
+        self._imu = struct.Struct(DEVICE_MESSAGE_MAP[IMU][1])
+        self._motor = struct.Struct(DEVICE_MESSAGE_MAP[MOTOR][1])
+
+    async def write_packet(self, packet: bytes) -> None:
+        """
+        Receive a packet written by the host.
+        """
+        self._buffer += packet
+        while True:
+            end = self._buffer.find(cobs.DELIMITER)
+            if end < 0:
+                return
+            data = cobs.unpack(bytes(self._buffer[: end + 1]))
+            del self._buffer[: end + 1]
+            self.frames_received += 1
+            response = self._respond(data)
+            self._requests += 1
+            if response is not None and (
+                not self.loss_every or self._requests % self.loss_every
+            ):
+                # the response arrives some time after the request was written
+                asyncio.get_running_loop().call_soon(self.send, response)
+
+    def _respond(self, data: bytes) -> bytes | None:
+        id = data[0]
+        if id == 0x00:
+            return struct.pack("<BBBHBBHHHHH", 0x01, *vars(self.info).values())
+        if id == 0x18:
+            return b"\x19Soak Hub\0"
+        if id == 0x1A:
+            return b"\x1b" + bytes(16)
+        # all other requests are answered with a successful status response
+        return struct.pack("<BB", id + 1, 0x00)
+
+    def send(self, payload: bytes) -> None:
+        """
+        Send a message to the host, split into packets of max_packet_size.
+        """
+        frame = cobs.pack(payload)
+        size = self.info.max_packet_size
+        for i in range(0, len(frame), size):
+            self.deliver(frame[i : i + size])
+        self.frames_sent += 1
+
+    def notify(self, step: int) -> None:
+        """
+        Send a device notification with the IMU and two motors.
+        """
+        records = self._imu.pack(IMU, 0, 0, step % 360, 0, 0, 0, 0, 1000, 0, 0, 0)
+        for port in (0, 1):
+            records += self._motor.pack(MOTOR, port, 48, 0, 0, 0, step)
+        header = struct.pack("<BH", DeviceNotification.ID, len(records))
+        self.send(header + records)
+
+    def print(self, line: str) -> None:
+        """
+        Send a line of console output.
+        """
+        self.send(b"\x21" + line.encode("utf8") + b"\n\0")
+
+
+def rss() -> int | None:
+    """
+    Return the resident set size of the process in bytes, if available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class Sample:
+    """
+    Measurements taken at one point of the test.
+    """
+
+    def __init__(self, frames: int, connection: HubConnection, rtts: list[float]):
+        self.frames = frames
+        self.traced = tracemalloc.get_traced_memory()[0]
+        self.rss = rss()
+        self.objects = len(gc.get_objects())
+        self.pending = connection.pending_requests()
+        self.p50 = percentile(rtts, 0.5)
+        self.p99 = percentile(rtts, 0.99)
+
+    def __str__(self) -> str:
+        rss = f"{self.rss / 1e6:.1f} MB" if self.rss is not None else "n/a"
+        return (
+            f"{self.frames:>10} frames  traced {self.traced / 1e6:7.2f} MB  "
+            f"rss {rss}  objects {self.objects:>7}  pending {self.pending:>3}  "
+            f"rtt p50 {self.p50 * 1e3:6.2f} ms  p99 {self.p99 * 1e3:6.2f} ms"
+        )
+
+
+class SoakLimits:
+    """
+    Largest growth allowed between the first and the last sample.
+    """
+
+    def __init__(
+        self,
+        traced: int = 1_000_000,
+        rss: int = 20_000_000,
+        objects: int = 5_000,
+        pending: int = 10,
+        p99_ratio: float = 3.0,
+        p99_floor: float = 0.002,
+    ):
+        self.traced = traced
+        self.rss = rss
+        self.objects = objects
+        self.pending = pending
+        # p99 may grow by this factor, once it is above the floor (in seconds)
+        self.p99_ratio = p99_ratio
+        self.p99_floor = p99_floor
+
+    def failures(self, first: Sample, last: Sample) -> list[str]:
+        """
+        Return a description of every limit that was exceeded.
+        """
+        failures = []
+        growth = {
+            "traced memory": (last.traced - first.traced, self.traced),
+            "objects": (last.objects - first.objects, self.objects),
+            "pending requests": (last.pending - first.pending, self.pending),
+        }
+        if first.rss is not None and last.rss is not None:
+            growth["RSS"] = (last.rss - first.rss, self.rss)
+        for name, (grown, limit) in growth.items():
+            if grown > limit:
+                failures.append(f"{name} grew by {grown} (limit {limit})")
+        if last.p99 > max(first.p99, self.p99_floor) * self.p99_ratio:
+            failures.append(
+                f"p99 round-trip time grew from {first.p99 * 1e3:.2f} ms "
+                f"to {last.p99 * 1e3:.2f} ms"
+            )
+        return failures
+
+
+async def soak(
+    frames: int,
+    samples: int = 10,
+    hub: SimulatedHub | None = None,
+    report: Callable[[Sample], None] | None = None,
+) -> list[Sample]:
+    """
+    Exchange about `frames` frames with a simulated hub, and return the
+    samples taken after the warm-up period.
+    """
+    hub = hub or SimulatedHub()
+    connection = HubConnection(hub.write_packet, pool=BufferPool())
+    hub.deliver = connection.on_packet
+    motors = 0
+
+    def on_motor(values: tuple) -> None:
+        nonlocal motors
+        motors += 1
+
+    connection.router.subscribe_device(MOTOR, on_motor)
+    connection.start()
+    await connection.handshake()
+
+    tracemalloc.start()
+    try:
+        rtts: list[float] = []
+        results: list[Sample] = []
+        next_sample = int(frames * WARMUP)
+        interval = max((frames - next_sample) // samples, 1)
+        step = 0
+        while True:
+            total = hub.frames_sent + hub.frames_received
+            if total >= next_sample:
+                gc.collect()
+                results.append(Sample(total, connection, rtts))
+                if report is not None:
+                    report(results[-1])
+                rtts.clear()
+                next_sample += interval
+                if total >= frames:
+                    break
+
+            step += 1
+            for _ in range(10):
+                hub.notify(step)
+            hub.print(f"step {step}")
+            connection.console.drain()
+
+            start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    connection.send_request(
+                        DeviceNotificationRequest(100), DeviceNotificationResponse
+                    ),
+                    REQUEST_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                pass  # the response was lost
+            else:
+                if response.success:
+                    rtts.append(time.perf_counter() - start)
+
+            if step % 50 == 0:
+                upload = upload_program(
+                    connection.send_request, 0, PROGRAM, INFO.max_chunk_size
+                )
+                try:
+                    await asyncio.wait_for(upload, REQUEST_TIMEOUT * 20)
+                except (TransferError, asyncio.TimeoutError):
+                    pass  # a response was lost
+        return results
+    finally:
+        tracemalloc.stop()
+        await connection.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(soak(args.frames, args.samples, report=print))
+    failures = SoakLimits().failures(results[0], results[-1])
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Example of safely replacing small files that may be written by several
+processes at once, such as the hub cache and the slot manifest.
+
+The data is first written to a temporary file with a unique name in the same
+directory, which then replaces the target file in a single step. Readers
+therefore see either the old or the new contents, never a partially written
+file, and concurrent writers do not interfere with each other's temporary
+files (the last one to finish wins).
+
+Example usage::
+
+    write_atomic(path, json.dumps(data).encode("utf8"))
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_atomic(path: Path | str, data: bytes) -> None:
+    """
+    Write data to a file, replacing the previous file atomically.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    f = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with f:
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(f.name)
+        raise
@@ -0,0 +1,221 @@
+"""
+Example of recording IMU and motor telemetry from device notifications in
+fixed-size NumPy ring buffers, for windowed statistics over many samples.
+
+Device messages are copied byte for byte from the payload of a
+DeviceNotification into a structured array with the same layout as the
+message, so no Python objects are created per sample. Statistics such as the
+mean, RMS or rate of change of a field are then computed over the most recent
+samples with vectorized NumPy operations.
+
+Each sample is written twice, at index `i` and `i + capacity`, so that the most
+recent `n` samples are always contiguous in memory. Windows and downsampled
+windows are therefore returned as views into the buffer, without copying.
+Views remain valid only until the buffer wraps around them, so copy them if
+they need to be kept.
+
+Example usage::
+
+    telemetry = {address: HubTelemetry() for address in addresses}
+
+    # in the notification handler
+    telemetry[address].feed(message.payload)
+
+    imu = telemetry[address].imu
+    print(imu.mean("yaw", 100), imu.rms("accel_z", 1000))
+    print(telemetry[address].motors[0].derivative("position", 10))
+"""
+
+from __future__ import annotations
+
+import struct
+import time
+
+import numpy as np
+
+from messages import DEVICE_MESSAGE_MAP
+
+
+CAPACITY = 4096
+"""Default number of samples kept per device"""
+
+IMU_ID = 0x01
+MOTOR_ID = 0x0A
+
+IMU_DTYPE = np.dtype(
+    [
+        ("id", "u1"),
+        ("face_up", "u1"),
+        ("yaw_face", "u1"),
+        ("yaw", "<i2"),
+        ("pitch", "<i2"),
+        ("roll", "<i2"),
+        ("accel_x", "<i2"),
+        ("accel_y", "<i2"),
+        ("accel_z", "<i2"),
+        ("gyro_x", "<i2"),
+        ("gyro_y", "<i2"),
+        ("gyro_z", "<i2"),
+    ]
+)
+"""Layout of a DeviceImuValues message"""
+
+MOTOR_DTYPE = np.dtype(
+    [
+        ("id", "u1"),
+        ("port", "u1"),
+        ("type", "u1"),
+        ("absolute_position", "<i2"),
+        ("power", "<i2"),
+        ("speed", "i1"),
+        ("position", "<i4"),
+    ]
+)
+"""Layout of a DeviceMotor message"""
+
+RECORD_SIZES = {id: struct.calcsize(fmt) for id, (_, fmt) in DEVICE_MESSAGE_MAP.items()}
+"""Size of each type of device message, used to step through a payload"""
+
+assert IMU_DTYPE.itemsize == RECORD_SIZES[IMU_ID]
+assert MOTOR_DTYPE.itemsize == RECORD_SIZES[MOTOR_ID]
+
+
+class RingBuffer:
+    """
+    Fixed-capacity time series of device messages of a single type.
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int = CAPACITY):
+        self.capacity = capacity
+        # every sample is stored twice, see the module docstring
+        self._values = np.zeros(2 * capacity, dtype)
+        self._times = np.zeros(2 * capacity, np.float64)
+        self._bytes = self._values.view(np.uint8).reshape(-1, dtype.itemsize)
+        # total number of samples appended so far
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, record: bytes | memoryview, timestamp: float) -> None:
+        """
+        Append a single device message, in the format received from the hub.
+        """
+        i = self.count % self.capacity
+        self._bytes[i] = record
+        self._bytes[i + self.capacity] = record
+        self._times[i] = self._times[i + self.capacity] = timestamp
+        self.count += 1
+
+    def _window(self, n: int | None) -> slice:
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.count % self.capacity + self.capacity if self.count else 0
+        return slice(end - n, end)
+
+    def window(self, n: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the timestamps and values of the most recent `n` samples
+        (all samples by default), oldest first.
+        """
+        window = self._window(n)
+        return self._times[window], self._values[window]
+
+    def field(self, name: str, n: int | None = None) -> np.ndarray:
+        """
+        Return a single field of the most recent `n` samples, oldest first.
+        """
+        return self._values[name][self._window(n)]
+
+    def times(self, n: int | None = None) -> np.ndarray:
+        return self._times[self._window(n)]
+
+    def mean(self, name: str, n: int | None = None) -> float:
+        return float(np.mean(self.field(name, n), dtype=np.float64))
+
+    def min(self, name: str, n: int | None = None) -> int:
+        return int(np.min(self.field(name, n)))
+
+    def max(self, name: str, n: int | None = None) -> int:
+        return int(np.max(self.field(name, n)))
+
+    def rms(self, name: str, n: int | None = None) -> float:
+        values = self.field(name, n).astype(np.float64)
+        return float(np.sqrt(np.mean(values * values)))
+
+    def derivative(self, name: str, n: int | None = None) -> np.ndarray:
+        """
+        Return the rate of change per second of a field between consecutive
+        samples, one element shorter than the window.
+        """
+        window = self._window(n)
+        values = self._values[name][window].astype(np.float64)
+        times = self._times[window]
+        return np.diff(values) / np.diff(times)
+
+    def rolling_mean(self, name: str, width: int, n: int | None = None) -> np.ndarray:
+        """
+        Return the mean of every `width` consecutive samples in the window.
+        """
+        values = self.field(name, n)
+        sums = np.zeros(len(values) + 1)
+        np.cumsum(values, dtype=np.float64, out=sums[1:])
+        return (sums[width:] - sums[:-width]) / width
+
+    def downsample(
+        self, factor: int, n: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the timestamps and values of every `factor`-th sample of the
+        window, ending with the most recent sample.
+        """
+        window = self._window(n)
+        if window.start == window.stop:
+            return self._times[window], self._values[window]
+        # step backwards from the newest sample, then restore the order
+        stop = window.start - 1 if window.start else None
+        step = slice(window.stop - 1, stop, -factor)
+        return self._times[step][::-1], self._values[step][::-1]
+
+
+class HubTelemetry:
+    """
+    Ring buffers for the IMU and every motor of a single hub.
+    """
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = capacity
+        self.imu = RingBuffer(IMU_DTYPE, capacity)
+        self.motors: dict[int, RingBuffer] = {}
+
+    def feed(self, payload: bytes, timestamp: float | None = None) -> int:
+        """
+        Record the IMU and motor messages in the payload of a DeviceNotification.
+        Other device messages are skipped. Returns the number of messages recorded.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        data = memoryview(payload)
+        recorded = 0
+        offset = 0
+        while offset < len(data):
+            id = data[offset]
+            size = RECORD_SIZES.get(id)
+            if size is None:
+                raise ValueError(f"Unknown device message: {id}")
+            if offset + size > len(data):
+                raise ValueError(f"Truncated device message: {id}")
+            record = data[offset : offset + size]
+            if id == IMU_ID:
+                self.imu.append(record, timestamp)
+                recorded += 1
+            elif id == MOTOR_ID:
+                port = data[offset + 1]
+                motor = self.motors.get(port)
+                if motor is None:
+                    motor = RingBuffer(MOTOR_DTYPE, self.capacity)
+                    self.motors[port] = motor
+                motor.append(record, timestamp)
+                recorded += 1
+            offset += size
+        return recorded
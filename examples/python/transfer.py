@@ -0,0 +1,47 @@
+"""
+Example of transferring a file to the hub in chunks.
+
+This is used for both program and firmware uploads, after the upload has been
+started with a StartFileUploadRequest or StartFirmwareUploadRequest.
+"""
+
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+from crc import crc
+from messages import BaseMessage, TransferChunkRequest, TransferChunkResponse
+
+
+SendRequest = Callable[[BaseMessage, type], Awaitable[BaseMessage]]
+"""Sends a message and waits for a response of the given type"""
+
+
+class TransferError(Exception):
+    """
+    Raised when the hub does not acknowledge part of a transfer.
+    """
+
+
+async def transfer_chunks(
+    send_request: SendRequest,
+    data: bytes,
+    chunk_size: int,
+    start: int = 0,
+    running_crc: int = 0,
+) -> int:
+    """
+    Transfer `data` from offset `start` in chunks of up to `chunk_size` bytes.
+
+    `running_crc` must be the running CRC of any data before `start` that
+    has already been transferred. Returns the running CRC for all data.
+    """
+    for i in range(start, len(data), chunk_size):
+        chunk = data[i : i + chunk_size]
+        running_crc = crc(chunk, running_crc)
+        chunk_response = await send_request(
+            TransferChunkRequest(running_crc, chunk), TransferChunkResponse
+        )
+        if not chunk_response.success:
+            raise TransferError(f"Failed to transfer chunk at offset {i}")
+    return running_crc
@@ -0,0 +1,259 @@
+"""
+Example of a data channel between the host and a program running on the hub,
+built on TunnelMessage.
+
+By default, data is sent as-is. Data written with `write()` is treated as a
+byte stream: small writes are batched into a single message, and large writes
+are split across as many messages as needed, with every message filled up to
+`max_message_size`. A datagram passed to `send()` is instead sent in messages
+of its own, so it is never mixed with other data. Each TunnelMessage received
+from the hub is one datagram, so programs on the hub can simply send their
+data as the payload of a message.
+
+If the program on the hub uses the same segment format (`framed=True`), the
+channel also preserves the boundaries of datagrams that are batched or split
+across messages, and `send()` batches datagrams like `write()`. Each
+TunnelMessage payload then holds one or more segments, each made up of:
+
+    * uint16: segment data `size`
+    * uint8: flags (0x01 = last segment of a datagram)
+    * uint8[`size`]: segment data
+
+Datagrams can be received one at a time with `recv()`, or the channel can be
+used as a byte stream with `read()`, which ignores datagram boundaries.
+
+Flow control comes from `send()` and `write()` waiting for complete messages
+to be sent before returning, so a fast producer is held back by the link. The
+rate can additionally be capped with `max_rate` if the hub program cannot keep
+up. Received datagrams are buffered up to `max_incoming`, after which the
+oldest ones are discarded and counted in `dropped`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+from collections import deque
+from typing import Awaitable, Callable
+
+from messages import BaseMessage, TunnelMessage
+
+
+SEGMENT = struct.Struct("<HB")
+"""Segment header: data size and flags"""
+
+END = 0x01
+"""Flag marking the last segment of a datagram"""
+
+MAX_DATAGRAM_SIZE = 65536
+"""Largest datagram reassembled from segments (in bytes)"""
+
+FLUSH_DELAY = 0.005
+"""How long a partially filled message may wait for more data (in seconds)"""
+
+MAX_INCOMING = 1000
+"""Default number of received datagrams to buffer before discarding the oldest ones"""
+
+_MESSAGE_HEADER_SIZE = 3
+"""Size of the TunnelMessage ID and payload size fields"""
+
+
+class TunnelChannel:
+    """
+    Datagram and stream channel over TunnelMessage.
+    """
+
+    def __init__(
+        self,
+        send_message: Callable[[BaseMessage], Awaitable[None]],
+        max_message_size: int,
+        delay: float = FLUSH_DELAY,
+        max_rate: float | None = None,
+        framed: bool = False,
+        max_incoming: int = MAX_INCOMING,
+    ):
+        self.send_message = send_message
+        self.framed = framed
+        # size of the header added to each piece of data sent
+        self._header_size = SEGMENT.size if framed else 0
+        self.payload_size = max_message_size - _MESSAGE_HEADER_SIZE
+        self.delay = delay
+        self.max_rate = max_rate
+        self.messages_sent = 0
+
+        # outgoing datagrams as [data, bytes already sent]
+        self._outgoing: deque[list] = deque()
+        self._outgoing_size = 0
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._next_send = 0.0
+
+        self._incoming: deque[bytes] = deque(maxlen=max_incoming)
+        self.dropped = 0
+        self._partial = bytearray()
+        self._received = asyncio.Event()
+
+    async def send(self, data: bytes) -> None:
+        """
+        Send a datagram of any size.
+        Unless the channel is framed, it is sent in messages of its own
+        (together with any data written before it) before returning.
+        """
+        if self.framed:
+            await self.write(data)
+            return
+        # without segment headers, the hub can only tell datagrams apart
+        # if they are not batched with other data
+        async with self._lock:
+            self._cancel_timer()
+            while self._outgoing:
+                await self._send_next()
+            for offset in range(0, max(len(data), 1), self.payload_size):
+                await self._send_payload(data[offset : offset + self.payload_size])
+
+    async def write(self, data: bytes) -> None:
+        """
+        Send data as part of a stream.
+        Returns once every complete message has been sent; the remainder is
+        sent together with later data, or when the deadline expires.
+        """
+        self._outgoing.append([data, 0])
+        self._outgoing_size += self._header_size + len(data)
+        async with self._lock:
+            while self._outgoing_size >= self.payload_size:
+                await self._send_next()
+            if self._outgoing and self._timer is None:
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(self.delay, self._on_deadline)
+
+    async def flush(self) -> None:
+        """
+        Send all pending data immediately.
+        """
+        async with self._lock:
+            self._cancel_timer()
+            while self._outgoing:
+                await self._send_next()
+
+    async def close(self) -> None:
+        """
+        Send all pending data, after a flush started by the deadline.
+        """
+        self._cancel_timer()
+        if self._flush_task is not None:
+            # its error (if any) has already been reported
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_deadline(self) -> None:
+        self._timer = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._on_flushed)
+
+    def _on_flushed(self, task: asyncio.Task) -> None:
+        # nobody awaits a flush started by the deadline
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error: {task.exception()}")
+
+    async def _send_next(self) -> None:
+        """Fill a message with as much pending data as possible and send it."""
+        payload = bytearray()
+        header_size = self._header_size
+        while self._outgoing and len(payload) + header_size < self.payload_size:
+            entry = self._outgoing[0]
+            data, offset = entry
+            space = self.payload_size - len(payload) - header_size
+            size = min(len(data) - offset, space)
+            end = offset + size == len(data)
+            if self.framed:
+                payload += SEGMENT.pack(size, END if end else 0)
+            payload += data[offset : offset + size]
+            if end:
+                self._outgoing.popleft()
+                self._outgoing_size -= header_size + size
+            else:
+                entry[1] += size
+                self._outgoing_size -= size
+        await self._send_payload(payload)
+
+    async def _send_payload(self, payload: bytes) -> None:
+        if self.max_rate:
+            # pace messages so that the average rate stays below max_rate
+            loop = asyncio.get_running_loop()
+            self._next_send = max(self._next_send, loop.time())
+            await asyncio.sleep(self._next_send - loop.time())
+            self._next_send += len(payload) / self.max_rate
+
+        self.messages_sent += 1
+        await self.send_message(TunnelMessage(bytes(payload)))
+
+    def receive(self, message: TunnelMessage) -> None:
+        """
+        Handle a TunnelMessage received from the hub.
+        """
+        try:
+            if self.framed:
+                self._receive_segments(message.payload)
+            else:
+                self._deliver(bytes(message.payload))
+        finally:
+            # datagrams completed before an invalid segment are still delivered
+            if self._incoming:
+                self._received.set()
+
+    def _receive_segments(self, payload: bytes) -> None:
+        offset = 0
+        while offset < len(payload):
+            if offset + SEGMENT.size > len(payload):
+                raise ValueError(f"Truncated tunnel segment at offset {offset}")
+            size, flags = SEGMENT.unpack_from(payload, offset)
+            if offset + SEGMENT.size + size > len(payload):
+                raise ValueError(f"Truncated tunnel segment at offset {offset}")
+            offset += SEGMENT.size
+            if len(self._partial) + size > MAX_DATAGRAM_SIZE:
+                self._partial.clear()
+                raise ValueError(
+                    f"Tunnel datagram larger than {MAX_DATAGRAM_SIZE} bytes"
+                )
+            self._partial += payload[offset : offset + size]
+            offset += size
+            if flags & END:
+                self._deliver(bytes(self._partial))
+                self._partial.clear()
+
+    def _deliver(self, data: bytes) -> None:
+        if len(self._incoming) == self._incoming.maxlen:
+            # the oldest datagram is discarded
+            self.dropped += 1
+        self._incoming.append(data)
+
+    async def recv(self) -> bytes:
+        """
+        Wait for and return the next datagram received from the hub.
+        """
+        while not self._incoming:
+            self._received.clear()
+            await self._received.wait()
+        data = self._incoming.popleft()
+        if not self._incoming:
+            self._received.clear()
+        return data
+
+    async def read(self) -> bytes:
+        """
+        Wait for and return all data received from the hub so far.
+        """
+        while not self._incoming:
+            self._received.clear()
+            await self._received.wait()
+        data = b"".join(self._incoming)
+        self._incoming.clear()
+        self._received.clear()
+        return data